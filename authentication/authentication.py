@@ -0,0 +1,106 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """Bounded LRU cache of users with a time to live, safe to share between threads.
+
+    A lookup notes the generation it started at and invalidating a user records a newer one, so a
+    lookup started before the invalidation can't store a stale user. Only the last `max_size`
+    invalidations are kept: older ones are folded into a floor that refuses every earlier lookup.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._invalidated = OrderedDict()
+        self._generation = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self, user_id):
+        """Generation to give back to `set` once the user is loaded."""
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id):
+        # les claims JWT portent l'id sous forme de chaîne
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user, version):
+        user_id = str(user.pk)
+        with self._lock:
+            # invalidé (ou peut-être invalidé, sous le plancher) depuis le début de la lecture
+            if self._invalidated.get(user_id, self._floor) > version:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+            self._invalidated.pop(user_id, None)
+            self._invalidated[user_id] = self._generation
+            while len(self._invalidated) > self.max_size:
+                self._floor = self._invalidated.popitem(last=False)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache_settings = getattr(settings, 'AUTH_USER_CACHE', {})
+user_cache = UserCache(
+    max_size=_cache_settings.get('MAX_SIZE', 1024),
+    ttl=_cache_settings.get('TTL', 300),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the token's user from an in-process cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            version = user_cache.version(user_id)
+            # lève AuthenticationFailed pour un user inconnu ou inactif
+            user = super().get_user(validated_token)
+            user_cache.set(user, version)
+        # chaque requête reçoit sa propre copie de l'instance mise en cache
+        return copy.copy(user)
@@ -0,0 +1,111 @@
+"""Compare the API renderers on realistic issue and comment pages.
+
+    python benchmarks/bench_renderers.py [--page-size 100] [--repeat 200]
+
+Pages are built with the real serializers from unsaved model instances, so no database is
+needed. Renderers whose optional dependency (orjson, msgpack) is missing are skipped.
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'softdesk.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from authentication.models import User  # noqa: E402
+from jobticket.models import Comment, Issue, Project  # noqa: E402
+from jobticket.serializers import CommentDetailSerializer, IssueListSerializer  # noqa: E402
+from softdesk import renderers  # noqa: E402
+
+WORDS = ('login', 'crash', 'android', 'timeout', 'refacto', 'cache', 'export', 'ticket',
+         'page', 'bouton', 'erreur', 'serveur', 'lenteur', 'écran', 'données', 'client')
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def build_pages(page_size, seed=42):
+    rng = random.Random(seed)
+    users = [User(id=i, email=f'user{i}@softdesk.test') for i in range(1, 21)]
+    project = Project(id=1, title='Application mobile', description=sentence(rng, 12), type='A')
+    start = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+
+    issues = [Issue(
+        id=i,
+        project=project,
+        title=sentence(rng, 5),
+        desc=sentence(rng, rng.randint(8, 60)),
+        tag=rng.choice(Issue.TAG_CHOICES)[0],
+        priority=rng.choice(Issue.PRIORITY_CHOICES)[0],
+        status=rng.choice(Issue.STATUS_CHOICES)[0],
+        author_user=rng.choice(users),
+        assigned_to=rng.choice(users),
+        created_time=start + datetime.timedelta(minutes=i),
+    ) for i in range(1, page_size + 1)]
+    comments = [Comment(
+        id=i,
+        issue=rng.choice(issues),
+        desc=sentence(rng, rng.randint(4, 80)),
+        author_user=rng.choice(users),
+        created_time=start + datetime.timedelta(minutes=i, seconds=30),
+    ) for i in range(1, page_size + 1)]
+
+    def page(results):
+        # même enveloppe que LimitOffsetPagination
+        return {
+            'count': page_size * 10,
+            'next': f'http://testserver/api/projects/1/issues/?limit={page_size}&offset={page_size}',
+            'previous': None,
+            'results': results,
+        }
+
+    return {
+        'issues': page(IssueListSerializer(issues, many=True).data),
+        'comments': page(CommentDetailSerializer(comments, many=True).data),
+    }
+
+
+def candidates():
+    yield 'json (stdlib)', JSONRenderer()
+    if renderers.orjson is not None:
+        yield 'orjson', renderers.FastJSONRenderer()
+    if renderers.msgpack is not None:
+        yield 'msgpack', renderers.MessagePackRenderer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    pages = build_pages(args.page_size)
+    print(f'{args.page_size} rows per page, {args.repeat} renders per measure')
+    print(f'{"page":<10}{"renderer":<16}{"µs/render":>12}{"bytes":>10}{"speedup":>10}{"size":>8}')
+    for name, data in pages.items():
+        baseline = None
+        for label, renderer in candidates():
+            body = renderer.render(data, renderer.media_type, {})
+            seconds = min(timeit.repeat(lambda: renderer.render(data, renderer.media_type, {}),
+                                        number=args.repeat, repeat=5)) / args.repeat
+            if baseline is None:
+                baseline = (seconds, len(body))
+            print(f'{name:<10}{label:<16}{seconds * 1e6:>12.1f}{len(body):>10}'
+                  f'{baseline[0] / seconds:>9.1f}x{len(body) / baseline[1]:>7.0%}')
+    missing = [module for module in ('orjson', 'msgpack') if getattr(renderers, module) is None]
+    if missing:
+        print(f'skipped (not installed): {", ".join(missing)}')
+
+
+if __name__ == '__main__':
+    main()
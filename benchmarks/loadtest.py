@@ -0,0 +1,322 @@
+"""End-to-end load test of the API served by `softdesk.wsgi` in a local threaded WSGI server.
+
+    SOFTDESK_DATABASE=/tmp/load.sqlite3 python manage.py migrate
+    SOFTDESK_DATABASE=/tmp/load.sqlite3 python manage.py generate_data --users 500 --projects 200
+    python benchmarks/loadtest.py --database /tmp/load.sqlite3 --users 50 --concurrency 8 \\
+        --duration 30 --output results.json [--compare baseline.json]
+
+Virtual users log in through `/api/login/` with the password of `generate_data`, then run
+weighted scenarios (mostly reads, some writes). Latency percentiles, requests per second and
+SQL queries per request are reported per route; `--output` writes them as JSON and `--compare`
+prints the difference with a previous run. The scenarios write to the database: never point the
+harness at a database you care about.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'softdesk.settings')
+
+# poids par défaut : surtout des lectures, quelques écritures
+WEIGHTS = {
+    'list_projects': 20,
+    'project_detail': 10,
+    'list_issues': 25,
+    'list_comments': 15,
+    'my_issues': 5,
+    'create_issue': 5,
+    'create_comment': 5,
+    'login': 2,
+}
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryCountingApp:
+    """WSGI middleware adding an `X-Query-Count` header with the number of SQL queries of the request."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        from django.db import connection
+
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        def counted_start_response(status, headers, exc_info=None):
+            # Django appelle start_response une fois la vue exécutée
+            return start_response(status, headers + [('X-Query-Count', str(queries[0]))], exc_info)
+
+        with connection.execute_wrapper(count):
+            return self.application(environ, counted_start_response)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, route, seconds, status, queries):
+        with self._lock:
+            self.samples[route].append((seconds, status, queries))
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    # rang le plus proche
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _ in samples if status >= 400),
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'mean_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50_ms': 1000 * percentile(latencies, 0.50),
+        'p95_ms': 1000 * percentile(latencies, 0.95),
+        'p99_ms': 1000 * percentile(latencies, 0.99),
+        'max_ms': 1000 * latencies[-1] if latencies else 0.0,
+        'queries_mean': sum(queries) / len(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+class Client:
+    def __init__(self, port, recorder):
+        self.port = port
+        self.recorder = recorder
+
+    def request(self, route, method, path, body=None, token=None):
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, payload, headers)
+            response = connection.getresponse()
+            content = response.read()
+            status, queries = response.status, response.getheader('X-Query-Count')
+        except OSError:
+            content, status, queries = b'', 599, None
+        finally:
+            connection.close()
+        self.recorder.add(route, time.perf_counter() - started, status, int(queries) if queries else None)
+        return status, content
+
+
+class VirtualUser:
+    """One API user: its JWT and the ids its scenarios pick from, loaded once before the run."""
+
+    def __init__(self, user, password):
+        from jobticket.models import Issue, Project, ProjectMembership
+
+        self.email = user.email
+        self.password = password
+        self.token = None
+        self.projects = list(ProjectMembership.objects.filter(user=user).values_list('project_id', flat=True)[:50])
+        self.authored_projects = list(
+            Project.objects.alive().filter(author_user=user).values_list('id', flat=True)[:20]
+        )
+        self.issues = list(Issue.objects.filter(project_id__in=self.projects).values_list('project_id', 'id')[:200])
+        self.authored_issues = list(Issue.objects.filter(author_user=user).values_list('project_id', 'id')[:50])
+
+    def login(self, client):
+        status, content = client.request('POST /api/login/', 'POST', '/api/login/',
+                                         {'email': self.email, 'password': self.password})
+        if status == 200:
+            self.token = json.loads(content)['access']
+        return status
+
+
+def scenario_path(name, user, rng):
+    """Route label, method, path and body of one scenario, or None when the user has nothing to act on."""
+    if name == 'list_projects':
+        return 'GET /api/projects/', 'GET', '/api/projects/', None
+    if name == 'my_issues':
+        return 'GET /api/my-issues/', 'GET', '/api/my-issues/', None
+    # le détail d'un projet est réservé à son auteur (IsAuthor)
+    if name == 'project_detail' and user.authored_projects:
+        return 'GET /api/projects/{id}/', 'GET', f'/api/projects/{rng.choice(user.authored_projects)}/', None
+    if name == 'list_issues' and user.projects:
+        return ('GET /api/projects/{id}/issues/', 'GET',
+                f'/api/projects/{rng.choice(user.projects)}/issues/', None)
+    if name == 'list_comments' and user.issues:
+        project_id, issue_id = rng.choice(user.issues)
+        return ('GET /api/projects/{id}/issues/{id}/comments/', 'GET',
+                f'/api/projects/{project_id}/issues/{issue_id}/comments/', None)
+    # écritures : seulement là où les permissions (IsAuthor) les autorisent
+    if name == 'create_issue' and user.authored_projects:
+        body = {'title': f'Load test issue {rng.randrange(10 ** 6)}', 'desc': 'Issue created by the load test harness',
+                'tag': 'Bug', 'priority': rng.choice(['Low', 'Medium', 'High']), 'status': 'To do'}
+        return ('POST /api/projects/{id}/issues/', 'POST',
+                f'/api/projects/{rng.choice(user.authored_projects)}/issues/', body)
+    if name == 'create_comment' and user.authored_issues:
+        project_id, issue_id = rng.choice(user.authored_issues)
+        return ('POST /api/projects/{id}/issues/{id}/comments/', 'POST',
+                f'/api/projects/{project_id}/issues/{issue_id}/comments/', {'desc': 'Comment from the load test'})
+    return None
+
+
+def worker(client, users, index, weights, deadline, seed):
+    rng = random.Random(seed + index)
+    names, values = zip(*weights.items())
+    while time.monotonic() < deadline:
+        user = users[rng.randrange(len(users))]
+        name = rng.choices(names, values)[0]
+        if name == 'login':
+            user.login(client)
+            continue
+        scenario = scenario_path(name, user, rng) or scenario_path('list_projects', user, rng)
+        route, method, path, body = scenario
+        client.request(route, method, path, body, user.token)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    header = f'{"route":<48}{"req":>7}{"err":>6}{"rps":>8}{"p50":>8}{"p95":>8}{"p99":>8}{"queries":>9}'
+    if baseline:
+        header += f'{"Δp95":>9}{"Δrps":>8}'
+    print(header)
+    for route, row in sorted(results['routes'].items()) + [('TOTAL', results['total'])]:
+        queries = '-' if row['queries_mean'] is None else f'{row["queries_mean"]:.1f}'
+        line = (f'{route:<48}{row["requests"]:>7}{row["errors"]:>6}{row["rps"]:>8.1f}'
+                f'{row["p50_ms"]:>8.1f}{row["p95_ms"]:>8.1f}{row["p99_ms"]:>8.1f}{queries:>9}')
+        previous = baseline and (baseline['total'] if route == 'TOTAL' else baseline['routes'].get(route))
+        if previous:
+            line += f'{relative(row["p95_ms"], previous["p95_ms"]):>9}{relative(row["rps"], previous["rps"]):>8}'
+        print(line)
+
+
+def relative(value, previous):
+    return f'{(value - previous) / previous:+.0%}' if previous else '-'
+
+
+def parse_weights(value):
+    weights = dict(WEIGHTS)
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in WEIGHTS:
+            raise argparse.ArgumentTypeError(f'unknown scenario {name!r}, choose from {", ".join(WEIGHTS)}')
+        weights[name] = float(weight)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help="SQLite file to use instead of the one of the settings.")
+    parser.add_argument('--users', type=int, default=20, help="Number of virtual users (existing accounts).")
+    parser.add_argument('--password', default='password', help="Password of the accounts (see generate_data).")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of load after the logins.")
+    parser.add_argument('--weights', type=parse_weights, default=dict(WEIGHTS),
+                        help="Overrides such as 'create_issue=0,list_issues=40'.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--compare', help="JSON results of a previous run to compare with.")
+    args = parser.parse_args()
+
+    from django.conf import settings
+
+    if args.database:
+        settings.DATABASES['default']['NAME'] = args.database
+
+    from softdesk.wsgi import application
+    from django.contrib.auth import get_user_model
+
+    accounts = list(get_user_model().objects.filter(is_active=True).order_by('id')[:args.users])
+    if not accounts:
+        parser.error('no user in the database, run `manage.py generate_data` first')
+    users = [VirtualUser(account, args.password) for account in accounts]
+
+    server = make_server('127.0.0.1', 0, QueryCountingApp(application),
+                         server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    recorder = Recorder()
+    client = Client(server.server_port, recorder)
+
+    failed = [user.email for user in users if user.login(client) != 200]
+    users = [user for user in users if user.token]
+    if not users:
+        parser.error(f'no virtual user could log in with the password {args.password!r}')
+    if failed:
+        print(f'{len(failed)} users could not log in and are left out')
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(client, users, index, args.weights,
+                                                     started + args.duration, args.seed))
+               for index in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    # les logins initiaux sont hors de la fenêtre mesurée
+    samples = dict(recorder.samples)
+    samples['POST /api/login/'] = samples.get('POST /api/login/', [])[len(accounts):]
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'users': len(users),
+            'concurrency': args.concurrency,
+            'duration': elapsed,
+            'weights': args.weights,
+        },
+        'routes': {route: summarize(rows, elapsed) for route, rows in samples.items() if rows},
+        'total': summarize([row for rows in samples.values() for row in rows], elapsed),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Microbenchmarks of the hot components, on a fixed seeded fixture in an in-memory database.
+
+    python benchmarks/microbench.py [--save results.json] [--baseline results.json --threshold 0.15]
+
+Each benchmark reports the best and median time per call over several repeats, and the peak
+memory and number of memory blocks still allocated after one call (tracemalloc). With
+`--baseline`, the command exits with status 1 when a benchmark's best time is slower than the
+baseline by more than `--threshold`, which makes it usable as a regression gate.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'softdesk.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+# DEBUG enregistre chaque requête SQL : le temps et la mémoire mesurés en seraient faussés
+settings.DEBUG = False
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Prefetch  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from authentication.models import User  # noqa: E402
+from jobticket.models import Contributor, Issue, Project, ProjectMembership  # noqa: E402
+from jobticket.permissions import IsContributor  # noqa: E402
+from jobticket.serializers import IssueListSerializer, ProjectDetailSerializer  # noqa: E402
+from jobticket.views import ProjectViewSet  # noqa: E402
+
+SEED = 2023
+factory = APIRequestFactory()
+
+
+def build_fixture():
+    """Test database filled by `generate_data` with a fixed seed, plus a user member of every project."""
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    call_command('generate_data', users=300, projects=300, issues_per_project=8, comments_per_issue=3,
+                 contributors_per_project=6, seed=SEED, skip_search_index=True, stdout=io.StringIO())
+    busy = User.objects.annotate(projects=Count('project_memberships')).order_by('-projects', 'id').first()
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(user=busy, project_id=pk) for pk in Project.objects.values_list('pk', flat=True)],
+        ignore_conflicts=True,
+    )
+    return busy
+
+
+def api_request(user, path='/'):
+    request = factory.get(path)
+    force_authenticate(request, user)
+    request = Request(request)
+    request.user  # authentification résolue hors de la mesure
+    return request
+
+
+def benchmarks(busy):
+    issues = list(Issue.objects.select_related('author_user', 'assigned_to').order_by('id')[:1000])
+    assert len(issues) == 1000, 'the fixture must hold 1000 issues'
+
+    project = Project.objects.annotate(size=Count('contributors')).order_by('-size', 'id').first()
+    project = Project.objects.select_related('author_user').prefetch_related(
+        Prefetch('contributors', queryset=Contributor.objects.select_related('user', 'project').order_by('id'))
+    ).get(pk=project.pk)
+    expand_request = api_request(project.author_user, '/?expand=contributors')
+
+    view = ProjectViewSet(request=api_request(busy, '/api/projects/'), action='list', format_kwarg=None, kwargs={})
+
+    issue = Issue.objects.filter(project__contributors__user=busy).order_by('id').first()
+    permission = IsContributor()
+
+    def issue_list_serializer():
+        return IssueListSerializer(issues, many=True).data
+
+    def project_detail_serializer():
+        return ProjectDetailSerializer(project, context={'request': expand_request}).data
+
+    def project_queryset():
+        return list(view.get_queryset())
+
+    def is_contributor():
+        # requête neuve : PermissionResolver ne garde son cache que le temps d'une requête
+        return permission.has_object_permission(api_request(busy), view, issue)
+
+    return {
+        'issue_list_serializer_1k': issue_list_serializer,
+        'project_detail_serializer': project_detail_serializer,
+        'project_viewset_get_queryset': project_queryset,
+        'is_contributor_object_permission': is_contributor,
+    }
+
+
+def measure(function, repeat, min_time=0.2):
+    function()  # chauffe : caches, imports paresseux
+    loops, elapsed = 1, 0.0
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = function()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return {
+        'loops': loops,
+        'best_us': min(timings) * 1e6,
+        'median_us': statistics.median(timings) * 1e6,
+        'peak_kib': peak / 1024,
+        'blocks': blocks,
+    }
+
+
+def check(results, baseline, threshold):
+    """Names of the benchmarks slower than the baseline by more than `threshold`."""
+    regressions = []
+    for name, row in results.items():
+        previous = baseline.get(name)
+        if previous and row['best_us'] > previous['best_us'] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', action='append', help="Run only this benchmark (repeatable).")
+    parser.add_argument('--save', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', help="JSON results to compare with.")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed slowdown, 0.15 = 15%%.")
+    args = parser.parse_args()
+
+    cases = benchmarks(build_fixture())
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['benchmarks']
+
+    print(f'{"benchmark":<36}{"loops":>7}{"best µs":>11}{"median µs":>11}{"peak KiB":>10}{"blocks":>8}{"vs base":>9}')
+    results = {}
+    for name, function in cases.items():
+        if args.only and name not in args.only:
+            continue
+        row = results[name] = measure(function, args.repeat)
+        previous = baseline.get(name)
+        change = f'{row["best_us"] / previous["best_us"] - 1:+.0%}' if previous else '-'
+        print(f'{name:<36}{row["loops"]:>7}{row["best_us"]:>11.1f}{row["median_us"]:>11.1f}'
+              f'{row["peak_kib"]:>10.1f}{row["blocks"]:>8}{change:>9}')
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'seed': SEED, 'benchmarks': results}, file, indent=2)
+
+    regressions = check(results, baseline, args.threshold)
+    if regressions:
+        print(f'Slower than the baseline by more than {args.threshold:.0%}: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
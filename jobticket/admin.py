@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from authentication.admin import UserAdmin
 from authentication.models import User
@@ -7,17 +6,12 @@ from .models import Project, Contributor, Issue, Comment
 
 
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('title', 'description', 'type', 'author_user')
-
-    def get_queryset(self, request):
-        qs = super(ProjectAdmin, self).get_queryset(request)
-        qs = qs.annotate(Count('contributors'))
-        return qs
+    list_display = ('title', 'description', 'type', 'author_user', 'project_contributor_count')
 
     def project_contributor_count(self, obj):
-        return obj.contributor_project__count
+        return obj.contributors_count
 
-    project_contributor_count.admin_order_field = 'contributors__count'
+    project_contributor_count.admin_order_field = 'contributors_count'
     project_contributor_count.short_description = 'Contributors'
 
     def __repr__(self):
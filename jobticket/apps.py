@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class JobticketConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'jobticket'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .slow_queries import install
+
+        connection_created.connect(install, dispatch_uid='jobticket_slow_queries')
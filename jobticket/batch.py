@@ -0,0 +1,90 @@
+"""Execution of the sub-requests of `/api/batch/` inside the current process.
+
+Each operation is dispatched straight to the view resolved from its path: the user authenticated
+by the batch request is forced on the sub-requests, so JWT and the middleware stack run only once.
+"""
+import io
+import json
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+MAX_OPERATIONS = getattr(settings, 'BATCH_MAX_OPERATIONS', 20)
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+PATH_PREFIX = '/api/'
+BATCH_PATH = '/api/batch/'
+
+# en-têtes du batch à ne pas propager aux sous-requêtes
+SKIPPED_META = ('wsgi.input', 'CONTENT_LENGTH', 'CONTENT_TYPE', 'QUERY_STRING',
+                'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def validate(operations):
+    """Return a list of error messages, empty when the operations can be executed."""
+    if not isinstance(operations, list) or not operations:
+        return ['Expected a non-empty list of operations.']
+    if len(operations) > MAX_OPERATIONS:
+        return [f'A batch is limited to {MAX_OPERATIONS} operations.']
+
+    errors = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append(f'Operation {index}: expected an object.')
+            continue
+        method = str(operation.get('method', 'GET')).upper()
+        path = urlsplit(str(operation.get('path', ''))).path
+        if method not in METHODS:
+            errors.append(f'Operation {index}: method must be one of {", ".join(METHODS)}.')
+        if not path.startswith(PATH_PREFIX) or path.startswith(BATCH_PATH):
+            errors.append(f'Operation {index}: path must be an API URL other than {BATCH_PATH}.')
+    return errors
+
+
+def build_request(request, method, path, body=None, atomic=False):
+    url = urlsplit(path)
+    content = b'' if body is None else json.dumps(body).encode('utf-8')
+    environ = {key: value for key, value in request.META.items() if key not in SKIPPED_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(content),
+    })
+    sub_request = WSGIRequest(environ)
+    # lu par rest_framework.request.Request : pas de nouvelle authentification
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    sub_request.user = request.user
+    # lu par CachedResponseMixin : pas de réponse en cache tirée de, ou bâtie sur, une transaction en cours
+    sub_request.skip_response_cache = atomic
+    return sub_request
+
+
+def execute(request, operation, atomic=False):
+    """Run one operation and return its result entry: `status` and `body`.
+
+    `atomic` tells that the operation runs in the transaction of an atomic batch.
+    """
+    method = str(operation.get('method', 'GET')).upper()
+    path = str(operation['path'])
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+
+    response = match.func(build_request(request, method, path, operation.get('body'), atomic),
+                          *match.args, **match.kwargs)
+    if response.streaming:
+        return {'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': 'Streaming responses cannot be batched.'}}
+    if hasattr(response, 'data'):
+        body = response.data
+    else:
+        body = response.content.decode(response.charset) or None
+    return {'status': response.status_code, 'body': body}
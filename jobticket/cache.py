@@ -0,0 +1,147 @@
+"""Per-user response cache for the read endpoints, invalidated through version keys.
+
+Every project and every user owns a version, stored in the database (`CacheVersion`) so that all
+worker processes agree on it. A cached response is keyed by the user, the URL and the versions
+it depends on: bumping a version (see `jobticket.signals`) makes every response built from the old
+one unreachable, without deleting anything.
+"""
+import hashlib
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CacheVersion, ProjectMembership
+
+KEY_PREFIX = 'softdesk'
+RESPONSE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def bump_versions(scope, pks):
+    """Change the versions once the current transaction commits (at once outside a transaction).
+
+    Bumped earlier, a concurrent reader could store data not yet committed, or rolled back, under the
+    new version. The ids are read now: the caller may delete the rows they come from.
+    """
+    pks = set(pks)
+    if pks:
+        transaction.on_commit(partial(write_versions, scope, pks))
+
+
+def write_versions(scope, pks, batch_size=500):
+    pks = sorted(pks)
+    now = timezone.now()
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(scope=scope, object_id=pk, modified_time=now) for pk in batch], ignore_conflicts=True,
+        )
+        # incrément en base : deux processus qui changent la même version ne perdent rien
+        CacheVersion.objects.filter(scope=scope, object_id__in=batch).update(
+            version=F('version') + 1, modified_time=now,
+        )
+
+
+def bump_project(project_id):
+    bump_projects([project_id])
+
+
+def bump_projects(project_ids):
+    bump_versions('project', project_ids)
+
+
+def bump_users(user_ids):
+    bump_versions('user', user_ids)
+
+
+def bump_project_members(project_id):
+    bump_users(ProjectMembership.objects.filter(project_id=project_id).values_list('user_id', flat=True))
+
+
+def request_versions(request, project_id=None):
+    """(version, modified time) of the user, then of the project if any; (0, None) when never bumped.
+
+    They are read once per request, in one query, and shared by the response cache and the conditional GET.
+    """
+    memo = request.__dict__.setdefault('_softdesk_versions', {})
+    if project_id not in memo:
+        keys = [('user', request.user.pk)]
+        if project_id is not None and str(project_id).isdigit():
+            keys.append(('project', int(project_id)))
+        condition = Q()
+        for scope, pk in keys:
+            condition |= Q(scope=scope, object_id=pk)
+        rows = {
+            (scope, pk): (version, modified_time)
+            for scope, pk, version, modified_time in CacheVersion.objects.filter(condition).values_list(
+                'scope', 'object_id', 'version', 'modified_time')
+        }
+        memo[project_id] = [rows.get(key, (0, None)) for key in keys]
+    return memo[project_id]
+
+
+def versions_string(request, project_id=None):
+    return ':'.join(str(version) for version, _ in request_versions(request, project_id))
+
+
+def response_key(request, project_id=None):
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:response:{request.user.pk}:{versions_string(request, project_id)}:{path}'
+
+
+def etag(request, project_id=None):
+    versions = versions_string(request, project_id)
+    # le rendu dépend aussi du format demandé
+    source = f'{request.user.pk}:{versions}:{request.get_full_path()}:{request.META.get("HTTP_ACCEPT", "")}'
+    return '"{}"'.format(hashlib.md5(source.encode('utf-8')).hexdigest())
+
+
+def last_modified(request, project_id=None):
+    """Time of the last change in seconds, None when one of the versions was never bumped."""
+    times = [modified_time for _, modified_time in request_versions(request, project_id)]
+    if None in times:
+        return None
+    return int(max(times).timestamp())
+
+
+def get_response(key):
+    cached = cache.get(key)
+    if cached is None:
+        stats.miss()
+    else:
+        stats.hit()
+    return cached
+
+
+def set_response(key, status_code, data):
+    cache.set(key, (status_code, data), RESPONSE_TIMEOUT)
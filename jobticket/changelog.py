@@ -0,0 +1,44 @@
+"""Log of the writes of issues and comments, read by the change feed (`IssueViewSet.changes`).
+
+Sequence numbers come from the single `ChangeCounter` row, incremented in the transaction of the
+write: its lock (the database lock on SQLite) is held until the commit, so the numbers follow the
+commit order. A client resuming after the last number it read can't miss a change committed later
+with a smaller number, as it could with `updated_time`.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Change, ChangeCounter
+
+
+def allocate(count):
+    """Reserve `count` sequence numbers and return the first one."""
+    if not ChangeCounter.objects.filter(pk=1).update(value=F('value') + count):
+        ChangeCounter.objects.create(pk=1, value=count)
+    return ChangeCounter.objects.values_list('value', flat=True).get(pk=1) - count + 1
+
+
+def record(entries, deleted=False):
+    """Log `(kind, object_id, issue_id, project_id)` entries, in the current transaction if any."""
+    entries = list(entries)
+    if not entries:
+        return
+    with transaction.atomic():
+        first = allocate(len(entries))
+        Change.objects.bulk_create([
+            Change(seq=first + offset, kind=kind, object_id=object_id, issue_id=issue_id, project_id=project_id,
+                   deleted=deleted)
+            for offset, (kind, object_id, issue_id, project_id) in enumerate(entries)
+        ], batch_size=1000)
+
+
+def issues_written(issues, deleted=False):
+    record([('issue', issue.pk, issue.pk, issue.project_id) for issue in issues], deleted)
+
+
+def issue_ids_written(project_id, issue_ids):
+    record([('issue', issue_id, issue_id, project_id) for issue_id in issue_ids])
+
+
+def comment_written(comment, project_id, deleted=False):
+    record([('comment', comment.pk, comment.issue_id, project_id)], deleted)
@@ -0,0 +1,88 @@
+"""Maintenance of the denormalized counters of Project and Issue.
+
+Every change is a single `UPDATE ... SET field = field + n` so concurrent writers never lose
+an increment. Decrements stop at zero (the columns are unsigned) and `reconcile` recomputes
+everything from the rows and fixes any drift.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Project, Contributor, Issue, Comment
+
+
+def _add(field, delta):
+    # un compteur déjà faux ne doit pas faire échouer l'écriture sur la contrainte >= 0
+    return F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+
+
+def _increments(deltas):
+    return {field: _add(field, delta) for field, delta in deltas.items() if delta}
+
+
+def update_project(project_id, **deltas):
+    increments = _increments(deltas)
+    if increments:
+        Project.objects.filter(pk=project_id).update(**increments)
+
+
+def status_deltas(status_counts, sign=1):
+    """Counter deltas for issues added (sign=1) or removed (sign=-1), given as {status: count}."""
+    deltas = Counter()
+    for issue_status, count in status_counts.items():
+        field = Issue.STATUS_COUNTERS.get(issue_status)
+        if field:
+            deltas[field] += sign * count
+    return deltas
+
+
+def issues_created(project_id, statuses):
+    update_project(project_id, **status_deltas(Counter(statuses)))
+
+
+def issue_deleted(issue):
+    update_project(issue.project_id, **status_deltas({issue.status: 1}, sign=-1))
+
+
+def issues_moved(project_id, old_status_counts, new_status):
+    deltas = status_deltas(old_status_counts, sign=-1)
+    deltas.update(status_deltas({new_status: sum(old_status_counts.values())}))
+    update_project(project_id, **deltas)
+
+
+def comments_changed(issue_id, delta):
+    Issue.objects.filter(pk=issue_id).update(comments_count=_add('comments_count', delta))
+    Project.objects.filter(issue_project__id=issue_id).update(comments_count=_add('comments_count', delta))
+
+
+def _count(queryset, field):
+    subquery = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        count=Count('pk')).values('count')
+    return Coalesce(Subquery(subquery), Value(0))
+
+
+def expected_project_counters():
+    counters = {
+        'contributors_count': _count(Contributor.objects.all(), 'project'),
+        'comments_count': _count(Comment.objects.all(), 'issue__project'),
+    }
+    for issue_status, field in Issue.STATUS_COUNTERS.items():
+        counters[field] = _count(Issue.objects.filter(status=issue_status), 'project')
+    return counters
+
+
+def reconcile():
+    """Recompute every counter, returns the number of projects and issues that had drifted."""
+    project_counters = expected_project_counters()
+    drifted_projects = Project.objects.annotate(
+        **{f'expected_{field}': expression for field, expression in project_counters.items()}
+    ).exclude(**{field: F(f'expected_{field}') for field in project_counters})
+    project_ids = list(drifted_projects.values_list('pk', flat=True))
+    Project.objects.filter(pk__in=project_ids).update(**project_counters)
+
+    comments = _count(Comment.objects.all(), 'issue')
+    issue_ids = list(Issue.objects.annotate(expected=comments).exclude(
+        comments_count=F('expected')).values_list('pk', flat=True))
+    Issue.objects.filter(pk__in=issue_ids).update(comments_count=comments)
+    return len(project_ids), len(issue_ids)
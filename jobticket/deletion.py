@@ -0,0 +1,142 @@
+"""Deletion of projects in two steps: hidden at once, purged later by a background worker.
+
+`schedule` hides the project (no more membership rows, `deleted_time` set) and records a
+`ProjectDeletion`. `purge` then removes the rows with batched raw DELETEs, each batch in its own
+short transaction, instead of letting the collector load every issue and comment in memory.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache, search
+from .models import Change, Comment, Contributor, Issue, Project, ProjectDeletion, ProjectMembership
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'PROJECT_DELETION_BATCH_SIZE', 1000)
+
+
+def delete_sql(model, where):
+    table = model._meta.db_table
+    return f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE {where} LIMIT %s)"
+
+
+COMMENTS_SQL = (
+    f"DELETE FROM {Comment._meta.db_table} WHERE id IN ("
+    f"SELECT c.id FROM {Comment._meta.db_table} c INNER JOIN {Issue._meta.db_table} i ON i.id = c.issue_id "
+    f"WHERE i.project_id = %s LIMIT %s)"
+)
+
+# (requête, compteur de progression) dans l'ordre des clés étrangères
+STEPS = [
+    (COMMENTS_SQL, 'comments_deleted'),
+    (delete_sql(Issue, 'project_id = %s'), 'issues_deleted'),
+    (delete_sql(Contributor, 'project_id = %s'), None),
+    (delete_sql(ProjectMembership, 'project_id = %s'), None),
+    (delete_sql(Change, 'project_id = %s'), None),
+]
+
+
+def schedule(project, user):
+    """Hide the project and queue its purge, returns the `ProjectDeletion`."""
+    with transaction.atomic():
+        Project.objects.filter(pk=project.pk).update(deleted_time=timezone.now())
+        deletion, _ = ProjectDeletion.objects.get_or_create(project_id=project.pk, defaults={
+            'requested_by': user,
+            'issues_total': sum(getattr(project, field) for field in Issue.STATUS_COUNTERS.values()),
+            'comments_total': project.comments_count,
+        })
+        # les versions des membres sont changées avant que leurs memberships disparaissent
+        cache.bump_project(project.pk)
+        cache.bump_project_members(project.pk)
+        ProjectMembership.objects.filter(project_id=project.pk).delete()
+        transaction.on_commit(lambda: submit(deletion.pk))
+    return deletion
+
+
+def submit(deletion_id):
+    if getattr(settings, 'PROJECT_DELETION_ASYNC', True):
+        worker.submit(deletion_id)
+    else:
+        purge(deletion_id)
+
+
+def delete_batches(deletion_id, sql, project_id, progress_field=None, batch_size=BATCH_SIZE):
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [project_id, batch_size])
+                deleted = cursor.rowcount
+            if progress_field and deleted:
+                ProjectDeletion.objects.filter(pk=deletion_id).update(**{progress_field: F(progress_field) + deleted})
+        if deleted < batch_size:
+            return
+
+
+def purge(deletion_id, batch_size=BATCH_SIZE):
+    """Remove every row of the project, can be resumed after an interruption."""
+    deletion = ProjectDeletion.objects.get(pk=deletion_id)
+    if deletion.status == ProjectDeletion.DONE:
+        return deletion
+    ProjectDeletion.objects.filter(pk=deletion_id).update(status=ProjectDeletion.RUNNING, error='')
+    project_id = deletion.project_id
+    try:
+        for sql, progress_field in STEPS:
+            delete_batches(deletion_id, sql, project_id, progress_field, batch_size)
+        while search.remove_project(project_id, batch_size) >= batch_size:
+            pass
+        # plus aucune ligne liée : le collector n'a plus rien à charger
+        Project.objects.filter(pk=project_id).delete()
+    except Exception as exc:
+        logger.exception('Purge of project %s failed', project_id)
+        ProjectDeletion.objects.filter(pk=deletion_id).update(status=ProjectDeletion.FAILED, error=str(exc))
+        raise
+    ProjectDeletion.objects.filter(pk=deletion_id).update(status=ProjectDeletion.DONE, finished_time=timezone.now())
+    return ProjectDeletion.objects.get(pk=deletion_id)
+
+
+def resume_pending(include_failed=False):
+    """Purge the deletions left unfinished (process restart), returns their number."""
+    statuses = [ProjectDeletion.PENDING, ProjectDeletion.RUNNING]
+    if include_failed:
+        statuses.append(ProjectDeletion.FAILED)
+    deletion_ids = list(ProjectDeletion.objects.filter(status__in=statuses).order_by('id').values_list('id', flat=True))
+    for deletion_id in deletion_ids:
+        purge(deletion_id)
+    return len(deletion_ids)
+
+
+class PurgeWorker:
+    """Single daemon thread purging the scheduled deletions one after the other."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, deletion_id):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name='project-purge', daemon=True)
+                self._thread.start()
+        self._queue.put(deletion_id)
+
+    def run(self):
+        while True:
+            deletion_id = self._queue.get()
+            try:
+                purge(deletion_id)
+            except Exception:
+                # déjà journalisé et marqué `failed` : reprise par `purge_deleted_projects`
+                pass
+            finally:
+                connection.close()
+                self._queue.task_done()
+
+
+worker = PurgeWorker()
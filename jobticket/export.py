@@ -0,0 +1,82 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment
+
+ISSUE_FIELDS = ['id', 'title', 'desc', 'tag', 'priority', 'status',
+                'author_user__email', 'assigned_to__email', 'created_time']
+COMMENT_FIELDS = ['id', 'issue_id', 'desc', 'author_user__email', 'created_time']
+CSV_COLUMNS = ['record', 'id', 'issue_id', 'title', 'desc', 'tag', 'priority', 'status',
+               'author_user', 'assigned_to', 'created_time']
+
+CHUNK_SIZE = 2000
+
+
+def iter_issue_chunks(issues, chunk_size=CHUNK_SIZE):
+    """Yield lists of issue rows, one query per chunk walking the primary key."""
+    last_id = 0
+    while True:
+        chunk = list(issues.filter(id__gt=last_id).order_by('id').values(*ISSUE_FIELDS)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]['id']
+
+
+def iter_records(issues, chunk_size=CHUNK_SIZE):
+    """Yield every issue followed by its comments, keeping at most one chunk in memory."""
+    for chunk in iter_issue_chunks(issues, chunk_size):
+        comments = {}
+        rows = Comment.objects.filter(issue_id__in=[issue['id'] for issue in chunk]).order_by('id')
+        for comment in rows.values(*COMMENT_FIELDS).iterator(chunk_size=chunk_size):
+            comments.setdefault(comment['issue_id'], []).append({
+                'record': 'comment',
+                'id': comment['id'],
+                'issue_id': comment['issue_id'],
+                'desc': comment['desc'],
+                'author_user': comment['author_user__email'],
+                'created_time': comment['created_time'],
+            })
+        for issue in chunk:
+            yield {
+                'record': 'issue',
+                'id': issue['id'],
+                'title': issue['title'],
+                'desc': issue['desc'],
+                'tag': issue['tag'],
+                'priority': issue['priority'],
+                'status': issue['status'],
+                'author_user': issue['author_user__email'],
+                'assigned_to': issue['assigned_to__email'],
+                'created_time': issue['created_time'],
+            }
+            yield from comments.get(issue['id'], ())
+
+
+def ndjson_lines(records):
+    encoder = DjangoJSONEncoder()
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS, restval='')
+    yield writer.writeheader()
+    for record in records:
+        if record.get('created_time') is not None:
+            record['created_time'] = record['created_time'].isoformat()
+        yield writer.writerow(record)
+
+
+FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
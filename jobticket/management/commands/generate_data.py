@@ -0,0 +1,204 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from jobticket import changelog, search
+from jobticket.models import Comment, Contributor, Issue, Project, ProjectMembership
+
+User = get_user_model()
+
+FIRST_NAMES = ('Jean', 'Marie', 'Luc', 'Sophie', 'Paul', 'Julie', 'Hugo', 'Emma', 'Louis', 'Chloé')
+LAST_NAMES = ('Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau')
+WORDS = ('login', 'crash', 'android', 'timeout', 'cache', 'export', 'ticket', 'page', 'bouton', 'erreur',
+         'serveur', 'lenteur', 'écran', 'données', 'client', 'paiement', 'formulaire', 'notification')
+
+
+class Generator:
+    """Builds the rows project by project and inserts them with bulk_create, one transaction per batch."""
+
+    # ordre d'insertion : les clés étrangères pointent vers des lignes déjà écrites
+    MODELS = (User, Project, ProjectMembership, Contributor, Issue, Comment)
+    # auto_now/auto_now_add écrasent les dates tirées au bulk_create : elles sont réécrites juste après
+    TIMESTAMPED = {Issue: ('created_time', 'updated_time'), Comment: ('created_time', 'updated_time')}
+
+    def __init__(self, options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.batch_size = options['batch_size']
+        self.start = datetime.datetime.combine(options['start'], datetime.time(), datetime.timezone.utc)
+        self.span = datetime.timedelta(days=options['days']).total_seconds()
+        self.buffers = {model: [] for model in self.MODELS}
+        self.created = {model: 0 for model in self.MODELS}
+        # entrées du journal du flux de changements (jobticket.changelog), écrites à chaque flush
+        self.changes = []
+        # identifiants explicites : pas besoin de relire les clés générées
+        self.next_ids = {model: (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1 for model in self.MODELS}
+
+    def next_id(self, model):
+        pk = self.next_ids[model]
+        self.next_ids[model] += 1
+        return pk
+
+    def skewed(self, mean, cap):
+        """Pareto-distributed count of average `mean`: many small values, a few huge ones."""
+        if mean <= 0:
+            return 0
+        shape = self.options['skew']
+        value = (self.rng.paretovariate(shape) - 1) * (shape - 1) * mean
+        return min(int(round(value)), cap)
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def timestamp(self, after=None):
+        if after is None:
+            return self.start + datetime.timedelta(seconds=self.rng.uniform(0, self.span))
+        end = self.start.timestamp() + self.span
+        return datetime.datetime.fromtimestamp(self.rng.uniform(after.timestamp(), end), datetime.timezone.utc)
+
+    def add(self, model, instance):
+        self.buffers[model].append(instance)
+        if sum(len(rows) for rows in self.buffers.values()) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for model, rows in self.buffers.items():
+                if rows:
+                    fields = self.TIMESTAMPED.get(model, ())
+                    timestamps = [[getattr(row, field) for field in fields] for row in rows]
+                    model.objects.bulk_create(rows, batch_size=self.batch_size)
+                    if fields:
+                        for row, values in zip(rows, timestamps):
+                            for field, value in zip(fields, values):
+                                setattr(row, field, value)
+                        # bulk_update ne passe pas par pre_save : les valeurs sont écrites telles quelles
+                        model.objects.bulk_update(rows, fields, batch_size=self.batch_size)
+                    self.created[model] += len(rows)
+                    rows.clear()
+            changelog.record(self.changes)
+            self.changes.clear()
+
+    def run(self):
+        options = self.options
+        password = make_password(options['password'])  # un seul hachage pour tous les users
+        user_ids = []
+        for _ in range(options['users']):
+            pk = self.next_id(User)
+            user_ids.append(pk)
+            self.add(User, User(
+                id=pk, email=f'user{pk}@{options["domain"]}', password=password, date_joined=self.start,
+                first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+            ))
+        for _ in range(options['projects']):
+            self.project(user_ids)
+        self.flush()
+
+    def project(self, user_ids):
+        options = self.options
+        project = Project(
+            id=self.next_id(Project), title=self.sentence(3), description=self.sentence(12),
+            type=self.rng.choice(Project.CHOICES)[0], author_user_id=self.rng.choice(user_ids),
+        )
+
+        # l'auteur est contributeur responsable, comme dans ProjectViewSet.create
+        others = self.skewed(options['contributors_per_project'], len(user_ids) - 1)
+        members = [project.author_user_id] + [
+            user_id for user_id in self.rng.sample(user_ids, min(others + 1, len(user_ids)))
+            if user_id != project.author_user_id
+        ][:others]
+        project.contributors_count = len(members)
+
+        # statuts et nombres de commentaires tirés d'abord : les compteurs sont complets quand
+        # le projet et ses issues sont ajoutés (un flush peut survenir à tout moment)
+        plan = [
+            (self.rng.choice(Issue.STATUS_CHOICES)[0],
+             self.skewed(options['comments_per_issue'], options['max_comments_per_issue']))
+            for _ in range(self.skewed(options['issues_per_project'], options['max_issues_per_project']))
+        ]
+        for issue_status, comments_count in plan:
+            field = Issue.STATUS_COUNTERS[issue_status]
+            setattr(project, field, getattr(project, field) + 1)
+            project.comments_count += comments_count
+        self.add(Project, project)
+        for position, user_id in enumerate(members):
+            self.add(ProjectMembership, ProjectMembership(
+                id=self.next_id(ProjectMembership), project_id=project.pk, user_id=user_id,
+            ))
+            self.add(Contributor, Contributor(
+                id=self.next_id(Contributor), project_id=project.pk, user_id=user_id,
+                role='Resp' if position == 0 else 'Contrib', permission='CRUD' if position == 0 else 'CR',
+            ))
+
+        for issue_status, comments_count in plan:
+            created_time = self.timestamp()
+            issue = Issue(
+                id=self.next_id(Issue), project_id=project.pk, title=self.sentence(5),
+                desc=self.sentence(self.rng.randint(8, 60)), tag=self.rng.choice(Issue.TAG_CHOICES)[0],
+                priority=self.rng.choice(Issue.PRIORITY_CHOICES)[0], status=issue_status,
+                author_user_id=self.rng.choice(members), assigned_to_id=self.rng.choice(members),
+                created_time=created_time, updated_time=created_time, comments_count=comments_count,
+            )
+            self.changes.append(('issue', issue.pk, issue.pk, project.pk))
+            self.add(Issue, issue)
+            for _ in range(comments_count):
+                comment_time = self.timestamp(after=created_time)
+                comment = Comment(
+                    id=self.next_id(Comment), issue_id=issue.pk, desc=self.sentence(self.rng.randint(4, 80)),
+                    author_user_id=self.rng.choice(members), created_time=comment_time, updated_time=comment_time,
+                )
+                self.changes.append(('comment', comment.pk, issue.pk, project.pk))
+                self.add(Comment, comment)
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with synthetic users, projects, contributors, issues and comments. "
+            "Sizes follow a skewed distribution and the data only depends on --seed. "
+            "Set SOFTDESK_DATABASE to write into another SQLite file than db.sqlite3.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=200)
+        parser.add_argument('--contributors-per-project', type=float, default=5,
+                            help="Average number of contributors besides the author.")
+        parser.add_argument('--issues-per-project', type=float, default=50, help="Average number of issues.")
+        parser.add_argument('--max-issues-per-project', type=int, default=100000)
+        parser.add_argument('--comments-per-issue', type=float, default=5, help="Average number of comments.")
+        parser.add_argument('--max-comments-per-issue', type=int, default=5000)
+        parser.add_argument('--skew', type=float, default=1.5,
+                            help="Pareto shape (> 1): the closer to 1, the more a few projects and issues "
+                                 "concentrate the rows.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows inserted per transaction.")
+        parser.add_argument('--start', type=datetime.date.fromisoformat, default=datetime.date(2023, 1, 1),
+                            help="Date of the oldest issue (YYYY-MM-DD).")
+        parser.add_argument('--days', type=int, default=365, help="Period covered by the issues and comments.")
+        parser.add_argument('--password', default='password', help="Password of every generated user.")
+        parser.add_argument('--domain', default='softdesk.test', help="Domain of the generated emails.")
+        parser.add_argument('--skip-search-index', action='store_true',
+                            help="Do not rebuild the full-text search index afterwards.")
+
+    def handle(self, *args, **options):
+        if options['skew'] <= 1:
+            raise CommandError("--skew must be greater than 1.")
+        if options['users'] < 1 and options['projects']:
+            raise CommandError("Projects need at least one user.")
+
+        began = time.monotonic()
+        generator = Generator(options)
+        # pas de signaux avec bulk_create : memberships et compteurs sont écrits avec les lignes
+        generator.run()
+        if not options['skip_search_index'] and search.is_available():
+            with transaction.atomic():
+                search.rebuild()
+
+        created = ', '.join(f"{count} {model._meta.verbose_name_plural}" for model, count in generator.created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} in {time.monotonic() - began:.1f}s ({connection.settings_dict['NAME']})."
+        ))
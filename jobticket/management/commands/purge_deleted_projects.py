@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from jobticket import deletion
+
+
+class Command(BaseCommand):
+    help = "Purge the deleted projects whose background purge did not finish (restart, crash)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--include-failed', action='store_true', help="Retry the failed purges too.")
+
+    def handle(self, *args, **options):
+        count = deletion.resume_pending(include_failed=options['include_failed'])
+        self.stdout.write(self.style.SUCCESS(f"{count} project deletions purged."))
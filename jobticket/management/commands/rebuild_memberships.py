@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobticket.models import ProjectMembership
+
+
+class Command(BaseCommand):
+    help = "Rebuild the project membership index from projects and contributors."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = ProjectMembership.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{count} memberships rebuilt."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from jobticket import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of issues and comments."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search requires the SQLite backend (FTS5).")
+        with transaction.atomic():
+            count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{count} rows indexed."))
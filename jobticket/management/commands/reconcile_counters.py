@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobticket import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized project and issue counters and fix any drift."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            projects, issues = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f"{projects} projects and {issues} issues fixed."))
@@ -0,0 +1,80 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORTS = {
+    'total': lambda group: group['total_ms'],
+    'max': lambda group: group['max_ms'],
+    'count': lambda group: group['count'],
+    'mean': lambda group: group['total_ms'] / group['count'],
+}
+
+
+def log_files(path):
+    """The log file followed by its rotated backups (`.1`, `.2`...)."""
+    path = Path(path)
+    backups = sorted(path.parent.glob(f'{path.name}.*'), key=lambda backup: backup.suffix)
+    return [candidate for candidate in [path, *backups] if candidate.is_file()]
+
+
+def read_records(paths):
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'fingerprint' in record:
+                    yield record
+
+
+def group_records(records):
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint'], {
+            'sql': record['fingerprint'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'views': Counter(), 'worst': record,
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['worst'] = record
+        group['views'][f"{record.get('route') or '-'}:{record.get('action') or '-'}"] += 1
+    return groups
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow-query log: the worst queries, the views running them and their plans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=getattr(settings, 'SLOW_QUERY_LOG_FILE', 'slow_queries.log'))
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--sort', choices=SORTS, default='total')
+        parser.add_argument('--no-plans', action='store_true', help="Do not print the query plans.")
+
+    def handle(self, *args, **options):
+        paths = log_files(options['file'])
+        if not paths:
+            raise CommandError(f"No slow-query log at {options['file']}.")
+
+        groups = sorted(group_records(read_records(paths)).values(), key=SORTS[options['sort']], reverse=True)
+        self.stdout.write(f"{sum(group['count'] for group in groups)} slow queries, {len(groups)} distinct, "
+                          f"read from {len(paths)} file(s).")
+        for rank, group in enumerate(groups[:options['limit']], start=1):
+            self.stdout.write(self.style.WARNING(
+                f"\n#{rank}  {group['count']} ×, total {group['total_ms']:.0f} ms, "
+                f"mean {group['total_ms'] / group['count']:.1f} ms, max {group['max_ms']:.1f} ms"
+            ))
+            self.stdout.write('    views: ' + ', '.join(
+                f'{view} ({count})' for view, count in group['views'].most_common(3)))
+            self.stdout.write(f"    {group['sql'][:500]}")
+            plan = group['worst'].get('plan')
+            if plan and not options['no_plans']:
+                self.stdout.write('    plan:')
+                for line in plan:
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_memberships(apps, schema_editor):
+    Project = apps.get_model('jobticket', 'Project')
+    Contributor = apps.get_model('jobticket', 'Contributor')
+    ProjectMembership = apps.get_model('jobticket', 'ProjectMembership')
+    rows = set(Project.objects.values_list('author_user_id', 'id'))
+    rows.update(Contributor.objects.values_list('user_id', 'project_id'))
+    ProjectMembership.objects.bulk_create(
+        [ProjectMembership(user_id=user_id, project_id=project_id) for user_id, project_id in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0014_alter_comment_issue_alter_contributor_permission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='jobticket.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'project'), name='unique_project_membership')],
+            },
+        ),
+        migrations.RunPython(populate_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0015_projectmembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'created_time', 'id'], name='comment_issue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+        ),
+    ]
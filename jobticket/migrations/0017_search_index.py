@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 n'existe que sous SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("""
+        CREATE VIRTUAL TABLE jobticket_search USING fts5(
+            title, body,
+            kind UNINDEXED, object_id UNINDEXED, issue_id UNINDEXED, project_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    schema_editor.execute("""
+        INSERT INTO jobticket_search (title, body, kind, object_id, issue_id, project_id)
+        SELECT title, "desc", 'issue', id, id, project_id FROM jobticket_issue
+    """)
+    schema_editor.execute("""
+        INSERT INTO jobticket_search (title, body, kind, object_id, issue_id, project_id)
+        SELECT '', c."desc", 'comment', c.id, c.issue_id, i.project_id
+        FROM jobticket_comment c INNER JOIN jobticket_issue i ON i.id = c.issue_id
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS jobticket_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0016_issue_comment_created_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def init_updated_time(apps, schema_editor):
+    apps.get_model('jobticket', 'Issue').objects.update(updated_time=F('created_time'))
+    apps.get_model('jobticket', 'Comment').objects.update(updated_time=F('created_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0017_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('issue', 'Issue'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('issue_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField()),
+                ('deleted_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(init_updated_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_time'], name='comment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'updated_time'], name='issue_project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['project_id', 'deleted_time'], name='tombstone_project_deleted_idx'),
+        ),
+    ]
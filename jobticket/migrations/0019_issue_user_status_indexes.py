@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0018_change_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assigned_to', 'status', 'created_time'], name='issue_assigned_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['author_user', 'status', 'created_time'], name='issue_author_status_idx'),
+        ),
+    ]
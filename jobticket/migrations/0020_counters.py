@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def init_counters(apps, schema_editor):
+    Project = apps.get_model('jobticket', 'Project')
+    Contributor = apps.get_model('jobticket', 'Contributor')
+    Issue = apps.get_model('jobticket', 'Issue')
+    Comment = apps.get_model('jobticket', 'Comment')
+
+    def count(queryset, field):
+        subquery = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+            count=Count('pk')).values('count')
+        return Coalesce(Subquery(subquery), Value(0))
+
+    Project.objects.update(
+        contributors_count=count(Contributor.objects.all(), 'project'),
+        todo_issues_count=count(Issue.objects.filter(status='To do'), 'project'),
+        in_progress_issues_count=count(Issue.objects.filter(status='In prog'), 'project'),
+        done_issues_count=count(Issue.objects.filter(status='Done'), 'project'),
+        comments_count=count(Comment.objects.all(), 'issue__project'),
+    )
+    Issue.objects.update(comments_count=count(Comment.objects.all(), 'issue'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0019_issue_user_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='contributors_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='done_issues_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_issues_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_issues_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(init_counters, migrations.RunPython.noop),
+    ]
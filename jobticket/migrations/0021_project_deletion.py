@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0020_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deleted_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProjectDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField(unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('issues_total', models.PositiveIntegerField(default=0)),
+                ('issues_deleted', models.PositiveIntegerField(default=0)),
+                ('comments_total', models.PositiveIntegerField(default=0)),
+                ('comments_deleted', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('finished_time', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='project_deletions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0021_project_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('project', 'Project'), ('user', 'User')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('modified_time', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'object_id'), name='unique_cache_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+def populate_change_log(apps, schema_editor):
+    Issue = apps.get_model('jobticket', 'Issue')
+    Comment = apps.get_model('jobticket', 'Comment')
+    Tombstone = apps.get_model('jobticket', 'Tombstone')
+    Change = apps.get_model('jobticket', 'Change')
+    ChangeCounter = apps.get_model('jobticket', 'ChangeCounter')
+
+    # l'historique existant est numéroté dans l'ordre des dates, les curseurs ISO ne sont plus acceptés
+    entries = [
+        (updated_time, 'issue', pk, pk, project_id, False)
+        for pk, project_id, updated_time in Issue.objects.values_list('pk', 'project_id', 'updated_time').iterator()
+    ]
+    entries.extend(
+        (updated_time, 'comment', pk, issue_id, project_id, False)
+        for pk, issue_id, project_id, updated_time in Comment.objects.values_list(
+            'pk', 'issue_id', 'issue__project_id', 'updated_time').iterator()
+    )
+    entries.extend(
+        (deleted_time, kind, object_id, issue_id, project_id, True)
+        for kind, object_id, issue_id, project_id, deleted_time in Tombstone.objects.values_list(
+            'kind', 'object_id', 'issue_id', 'project_id', 'deleted_time').iterator()
+    )
+    entries.sort(key=lambda entry: entry[0])
+    Change.objects.bulk_create([
+        Change(seq=seq, kind=kind, object_id=object_id, issue_id=issue_id, project_id=project_id, deleted=deleted)
+        for seq, (_, kind, object_id, issue_id, project_id, deleted) in enumerate(entries, start=1)
+    ], batch_size=1000)
+    ChangeCounter.objects.create(pk=1, value=len(entries))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobticket', '0022_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(unique=True)),
+                ('kind', models.CharField(choices=[('issue', 'Issue'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('issue_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_change_log, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='Tombstone',
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='issue',
+            name='issue_project_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['project_id', 'seq'], name='change_project_seq_idx'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+import time
+
+from django.shortcuts import get_object_or_404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from . import cache as response_cache
+from .models import Project
+
+
+class EagerLoadingViewMixin:
+    """Applies the select_related/prefetch_related declared by the serializer of the current action.
+
+    On read requests, serializers supporting `?fields=`/`?expand=` also restrict the loaded columns.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request.method in SAFE_METHODS and hasattr(serializer_class, 'optimize_queryset'):
+            queryset = self.get_serializer().optimize_queryset(queryset)
+        elif hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+
+class CachedResponseMixin:
+    """Serves `list` and `retrieve` from the per-user response cache of `jobticket.cache`."""
+
+    # kwarg de l'URL portant le projet dont dépend la réponse
+    cache_project_kwarg = 'project_id'
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if getattr(request, 'skip_response_cache', False):
+            # sous-requête d'un batch atomique : elle voit des écritures pas encore validées
+            return handler(request, *args, **kwargs)
+        key = response_cache.response_key(request, self.kwargs.get(self.cache_project_kwarg))
+        cached = response_cache.get_response(key)
+        if cached is not None:
+            status_code, data = cached
+            response = Response(data, status=status_code)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set_response(key, response.status_code, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """Answers `list` and `retrieve` with 304 Not Modified while the client's ETag/Last-Modified are current.
+
+    Validators come from the versions of `jobticket.cache`, read in one query. A 304 is only sent
+    once `check_readable` has confirmed the resource exists and the user may read it.
+    """
+
+    cache_project_kwarg = 'project_id'
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_object(self):
+        # `check_readable` puis `retrieve` : l'objet n'est chargé qu'une fois
+        if not hasattr(self, '_conditional_object'):
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def check_readable(self, request):
+        """Raise 404/403 unless the resource exists and the user may read it."""
+        if self.action == 'retrieve':
+            self.get_object()
+        elif self.kwargs.get(self.cache_project_kwarg) is not None:
+            get_object_or_404(Project.objects.visible_to(request.user), pk=self.kwargs[self.cache_project_kwarg])
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        project_id = self.kwargs.get(self.cache_project_kwarg)
+        etag = response_cache.etag(request, project_id)
+        last_modified = response_cache.last_modified(request, project_id)
+
+        if self.is_not_modified(request, etag, last_modified):
+            # les validateurs se calculent sans la ressource : elle est vérifiée avant de répondre 304
+            self.check_readable(request)
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        # une modification plus tard dans la même seconde aurait le même Last-Modified
+        if last_modified is not None and last_modified < int(time.time()):
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match prime sur If-Modified-Since ; `*` vaut pour toute représentation existante
+            # (RFC 7232), ce que `check_readable` vérifie
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags or f'W/{etag}' in etags
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        # une date dans le futur est ignorée (RFC 7232, section 3.3)
+        if if_modified_since is None or last_modified is None or if_modified_since > time.time():
+            return False
+        return last_modified <= if_modified_since
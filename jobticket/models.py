@@ -3,6 +3,34 @@ from django.core.validators import MinLengthValidator
 from django.db import models
 
 
+class ProjectQuerySet(models.QuerySet):
+    def alive(self):
+        """Projects not scheduled for deletion (see `jobticket.deletion`)."""
+        return self.filter(deleted_time__isnull=True)
+
+    def visible_to(self, user):
+        """Projects the user authored or contributes to, through the membership index."""
+        return self.filter(memberships__user=user)
+
+
+class IssueQuerySet(models.QuerySet):
+    def alive(self):
+        """Issues of the projects not scheduled for deletion."""
+        return self.filter(project__deleted_time__isnull=True)
+
+    def visible_to(self, user):
+        return self.filter(project__memberships__user=user)
+
+
+class CommentQuerySet(models.QuerySet):
+    def alive(self):
+        """Comments of the projects not scheduled for deletion."""
+        return self.filter(issue__project__deleted_time__isnull=True)
+
+    def visible_to(self, user):
+        return self.filter(issue__project__memberships__user=user)
+
+
 class Project(models.Model):
     CHOICES = (
         ('W', 'Web'),
@@ -17,6 +45,16 @@ class Project(models.Model):
     author_user = models.ForeignKey(
         to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_author'
     )
+    # compteurs dénormalisés, tenus à jour par jobticket.counters
+    contributors_count = models.PositiveIntegerField(default=0)
+    todo_issues_count = models.PositiveIntegerField(default=0)
+    in_progress_issues_count = models.PositiveIntegerField(default=0)
+    done_issues_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # renseigné quand la suppression est planifiée : le projet est masqué en attendant la purge
+    deleted_time = models.DateTimeField(null=True, blank=True)
+
+    objects = ProjectQuerySet.as_manager()
 
     def is_valid_choice(self, value):
         return value in dict(self.CHOICES).keys()
@@ -64,6 +102,13 @@ class Issue(models.Model):
         ('Done', 'Terminé')
     )
 
+    # compteur de Project correspondant à chaque statut
+    STATUS_COUNTERS = {
+        'To do': 'todo_issues_count',
+        'In prog': 'in_progress_issues_count',
+        'Done': 'done_issues_count',
+    }
+
     title = models.CharField(max_length=200, validators=[MinLengthValidator(5)])
     desc = models.CharField(max_length=2000, validators=[MinLengthValidator(20)])
     project = models.ForeignKey(
@@ -79,6 +124,24 @@ class Issue(models.Model):
         to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='issue_assigned'
     )
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    objects = IssueQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+            models.Index(fields=['assigned_to', 'status', 'created_time'], name='issue_assigned_status_idx'),
+            models.Index(fields=['author_user', 'status', 'created_time'], name='issue_author_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # statut lu en base, pour détecter les changements de statut à la sauvegarde
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
 
 class Comment(models.Model):
@@ -90,3 +153,170 @@ class Comment(models.Model):
         to=Issue, on_delete=models.CASCADE, related_name='comments'
     )
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time', 'id'], name='comment_issue_created_idx'),
+        ]
+
+
+class ProjectMembershipManager(models.Manager):
+    def grant(self, project_id, user_id):
+        self.grant_many([(project_id, user_id)])
+
+    def grant_many(self, pairs):
+        """Add the (project_id, user_id) memberships that don't exist yet."""
+        self.bulk_create(
+            [self.model(project_id=project_id, user_id=user_id) for project_id, user_id in pairs],
+            ignore_conflicts=True,
+        )
+
+    def revoke(self, project_id, user_id):
+        """Drop the membership unless the user still authors or contributes to the project."""
+        still_member = (
+            Project.objects.alive().filter(pk=project_id, author_user_id=user_id).exists()
+            or Contributor.objects.filter(project_id=project_id, user_id=user_id).exists()
+        )
+        if not still_member:
+            self.filter(project_id=project_id, user_id=user_id).delete()
+
+    def sync_project(self, project_id):
+        """Align the membership rows of one project with its author and contributors."""
+        project = Project.objects.alive().filter(pk=project_id).values('author_user_id').first()
+        if project is None:
+            return
+        wanted = set(Contributor.objects.filter(project_id=project_id).values_list('user_id', flat=True))
+        wanted.add(project['author_user_id'])
+        existing = set(self.filter(project_id=project_id).values_list('user_id', flat=True))
+        if existing - wanted:
+            self.filter(project_id=project_id, user_id__in=existing - wanted).delete()
+        self.bulk_create(
+            [self.model(project_id=project_id, user_id=user_id) for user_id in wanted - existing],
+            ignore_conflicts=True,
+        )
+
+    def rebuild(self):
+        """Recompute the whole index from projects and contributors, returns the number of rows."""
+        rows = set(Project.objects.alive().values_list('author_user_id', 'id'))
+        rows.update(Contributor.objects.filter(project__deleted_time__isnull=True).values_list('user_id', 'project_id'))
+        self.all().delete()
+        self.bulk_create(
+            [self.model(user_id=user_id, project_id=project_id) for user_id, project_id in rows],
+            batch_size=1000,
+        )
+        return len(rows)
+
+
+class ProjectMembership(models.Model):
+    """One row per (user, project) the user can see, maintained by signals.
+
+    Replaces the `author_user OR contributors__user` join + DISTINCT in the visibility filters.
+    """
+
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_memberships'
+    )
+    project = models.ForeignKey(
+        to=Project, on_delete=models.CASCADE, related_name='memberships'
+    )
+
+    objects = ProjectMembershipManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'project'], name='unique_project_membership'),
+        ]
+
+
+class CacheVersion(models.Model):
+    """Version of the responses built from one project or for one user, see `jobticket.cache`.
+
+    Kept in the database so that every worker process serves the same validators.
+    """
+
+    SCOPE_CHOICES = (
+        ('project', 'Project'),
+        ('user', 'User'),
+    )
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    object_id = models.BigIntegerField()
+    version = models.PositiveBigIntegerField(default=0)
+    modified_time = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id'], name='unique_cache_version'),
+        ]
+
+
+class ChangeCounter(models.Model):
+    """Single row handing out the sequence numbers of the change log, see `jobticket.changelog`."""
+
+    value = models.BigIntegerField(default=0)
+
+
+class Change(models.Model):
+    """One write (or deletion) of an issue or a comment, numbered in commit order for the change feed.
+
+    Plain ids instead of foreign keys: deletions are logged too.
+    """
+
+    KIND_CHOICES = (
+        ('issue', 'Issue'),
+        ('comment', 'Comment'),
+    )
+
+    seq = models.BigIntegerField(unique=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    issue_id = models.BigIntegerField()
+    project_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'seq'], name='change_project_seq_idx'),
+        ]
+
+
+class ProjectDeletion(models.Model):
+    """Progress of the background purge of a deleted project.
+
+    Keeps a plain project id: the record outlives the project.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    project_id = models.BigIntegerField(unique=True)
+    requested_by = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='project_deletions'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    issues_total = models.PositiveIntegerField(default=0)
+    issues_deleted = models.PositiveIntegerField(default=0)
+    comments_total = models.PositiveIntegerField(default=0)
+    comments_deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_time = models.DateTimeField(auto_now_add=True)
+    finished_time = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 1.0
+        total = self.issues_total + self.comments_total
+        done = self.issues_deleted + self.comments_deleted
+        return min(done / total, 1.0) if total else 0.0
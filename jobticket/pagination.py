@@ -0,0 +1,113 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward pagination on (created_time, id) with opaque cursors.
+
+    Every page is an index range scan, whatever its depth, and no COUNT(*) is run.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('created_time', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            created_time, pk = position
+            # `created_time >= t` garde un parcours d'index sur (…, created_time, id)
+            queryset = queryset.filter(created_time__gte=created_time).filter(
+                Q(created_time__gt=created_time) | Q(id__gt=pk)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = (results[-1].created_time, results[-1].pk) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        created_time, pk = position
+        raw = f'{created_time.isoformat()}|{pk}'
+        return urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_time, pk = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            created_time = parse_datetime(created_time)
+            pk = int(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_time is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_time, pk
+
+
+class CreatedTimePagination(BasePagination):
+    """Offset pagination by default, keyset pagination with `?pagination=cursor` or a `cursor` parameter."""
+
+    mode_query_param = 'pagination'
+    # offset : sans `?limit=`, la liste entière comme LimitOffsetPagination sans PAGE_SIZE
+    default_limit = None
+    max_limit = None
+
+    def __init__(self):
+        self.offset_paginator = LimitOffsetPagination()
+        self.offset_paginator.default_limit = self.default_limit
+        self.offset_paginator.max_limit = self.max_limit
+        self.keyset_paginator = KeysetPagination()
+        self.paginator = self.offset_paginator
+
+    def use_keyset(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_paginator.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.keyset_paginator if self.use_keyset(request) else self.offset_paginator
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+class MyIssuePagination(CreatedTimePagination):
+    """Bounded offset pages for `/api/my-issues/`, which spans every project of the user."""
+
+    default_limit = KeysetPagination.page_size
+    max_limit = KeysetPagination.max_page_size
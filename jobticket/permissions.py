@@ -1,14 +1,63 @@
+from django.db.models import OuterRef, Subquery
 from rest_framework.permissions import BasePermission
-from .models import Project, Contributor
+from .models import Project, Contributor, Issue, Comment
 
 
-def project_contributor(request, obj):
-    is_project_contributor = Project.objects.filter(
-        contributors__project_id=obj.id,
-        contributors__user_id=request.user.id,
-    )
-    is_project_author = obj.author_user == request.user
-    return is_project_contributor or is_project_author
+class ProjectAccess:
+    """Role of one user on one project."""
+
+    def __init__(self, is_author=False, role=None):
+        self.is_author = is_author
+        self.role = role
+
+    @property
+    def is_member(self):
+        return self.is_author or self.role is not None
+
+
+class PermissionResolver:
+    """Loads the user's access to a project once, then answers every check of the request from memory."""
+
+    def __init__(self, user):
+        self.user = user
+        self._access = {}
+
+    @classmethod
+    def for_request(cls, request):
+        resolver = getattr(request, '_permission_resolver', None)
+        if resolver is None or resolver.user != request.user:
+            resolver = cls(request.user)
+            request._permission_resolver = resolver
+        return resolver
+
+    @staticmethod
+    def project_id_for(obj):
+        if isinstance(obj, Project):
+            return obj.pk
+        if isinstance(obj, (Issue, Contributor)):
+            return obj.project_id
+        if isinstance(obj, Comment):
+            # les vues chargent l'issue avec select_related('issue')
+            return obj.issue.project_id
+        return None
+
+    def access(self, project_id):
+        if project_id not in self._access:
+            contributor = Contributor.objects.filter(project_id=OuterRef('pk'), user_id=self.user.id)
+            row = Project.objects.alive().filter(pk=project_id).annotate(
+                contributor_role=Subquery(contributor.values('role')[:1]),
+            ).values('author_user_id', 'contributor_role').first()
+            if row is None:
+                self._access[project_id] = ProjectAccess()
+            else:
+                self._access[project_id] = ProjectAccess(
+                    is_author=row['author_user_id'] == self.user.id,
+                    role=row['contributor_role'],
+                )
+        return self._access[project_id]
+
+    def access_for(self, obj):
+        return self.access(self.project_id_for(obj))
 
 
 class IsAuthor(BasePermission):
@@ -21,10 +70,8 @@ class IsAuthor(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if isinstance(obj, Contributor):
-            return bool(obj.user == request.user)
-        elif obj.author_user == request.user:
-            return bool(obj.author_user == request.user)
-        return False
+            return obj.user_id == request.user.id
+        return obj.author_user_id == request.user.id
 
 
 class IsContributor(BasePermission):
@@ -36,6 +83,6 @@ class IsContributor(BasePermission):
         return bool(request.user and request.user.is_authenticated)
 
     def has_object_permission(self, request, view, obj):
-        if project_contributor(request, obj):
+        if getattr(obj, 'author_user_id', None) == request.user.id:
             return True
-        return False
+        return PermissionResolver.for_request(request).access_for(obj).is_member
@@ -0,0 +1,109 @@
+"""Full-text index of issues and comments, stored in an SQLite FTS5 virtual table.
+
+The table is created by migration 0017 and kept in sync by the signals of `jobticket.signals`.
+On other database backends every function is a no-op and `search` returns no result.
+"""
+from django.db import connection
+
+TABLE = 'jobticket_search'
+
+INSERT = f"INSERT INTO {TABLE} (title, body, kind, object_id, issue_id, project_id) VALUES (%s, %s, %s, %s, %s, %s)"
+DELETE = f"DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s"
+
+# poids bm25 des colonnes title et body
+TITLE_WEIGHT = 4.0
+BODY_WEIGHT = 1.0
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def index_issues(issues):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(DELETE, [('issue', issue.pk) for issue in issues])
+        cursor.executemany(INSERT, [
+            (issue.title, issue.desc, 'issue', issue.pk, issue.pk, issue.project_id) for issue in issues
+        ])
+
+
+def index_comments(comments):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(DELETE, [('comment', comment.pk) for comment in comments])
+        cursor.executemany(INSERT, [
+            ('', comment.desc, 'comment', comment.pk, comment.issue_id, comment.issue.project_id)
+            for comment in comments
+        ])
+
+
+def remove(kind, object_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE, [kind, object_id])
+
+
+def remove_project(project_id, limit):
+    """Drop at most `limit` rows of a project, returns the number of removed rows."""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE rowid IN (SELECT rowid FROM {TABLE} WHERE project_id = %s LIMIT %s)",
+            [project_id, limit],
+        )
+        return cursor.rowcount
+
+
+def rebuild():
+    """Recreate the index from the issue and comment tables, returns the number of indexed rows."""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (title, body, kind, object_id, issue_id, project_id)
+            SELECT title, "desc", 'issue', id, id, project_id FROM jobticket_issue
+        """)
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (title, body, kind, object_id, issue_id, project_id)
+            SELECT '', c."desc", 'comment', c.id, c.issue_id, i.project_id
+            FROM jobticket_comment c INNER JOIN jobticket_issue i ON i.id = c.issue_id
+        """)
+        cursor.execute(f"SELECT count(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match(query):
+    """Turn free text into an FTS5 query: every word must match, FTS5 operators are neutralised."""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in query.split()]
+    return ' '.join(terms)
+
+
+def search(user, query, project_id=None, limit=20, offset=0):
+    """Ranked matches in the projects visible to the user (same membership rule as the viewsets)."""
+    match = build_match(query)
+    if not match or not is_available():
+        return []
+    sql = f"""
+        SELECT kind, object_id, issue_id, project_id, title,
+               snippet({TABLE}, 1, '[', ']', '…', 16),
+               bm25({TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank
+        FROM {TABLE}
+        WHERE {TABLE} MATCH %s
+          AND project_id IN (SELECT project_id FROM jobticket_projectmembership WHERE user_id = %s)
+    """
+    params = [match, user.pk]
+    if project_id is not None:
+        sql += " AND project_id = %s"
+        params.append(project_id)
+    sql += " ORDER BY rank LIMIT %s OFFSET %s"
+    params += [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = ['kind', 'id', 'issue_id', 'project_id', 'title', 'snippet', 'rank']
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -1,18 +1,136 @@
+import re
+
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.serializers import ModelSerializer
-from .models import Project, Issue, Comment, Contributor
+from .models import Project, Issue, Comment, Contributor, ProjectDeletion
 from rest_framework import serializers
 
 User = get_user_model()
 
+# `get_<champ>_display` se lit dans la colonne <champ>
+DISPLAY_METHOD = re.compile(r'^get_(?P<field>\w+)_display$')
+
+
+class EagerLoadingMixin:
+    """Declares the relations read by the serializer so the viewset can load them up front."""
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+class DynamicFieldsMixin(EagerLoadingMixin):
+    """On read requests, `?fields=a,b` keeps only these fields and `?expand=x` nests the relation `x`.
+
+    `optimize_queryset` then loads only the columns and declared relations the kept fields read.
+    """
+
+    def get_expandable_fields(self):
+        """Nested serializers replacing a field when it is listed in `?expand=`."""
+        return {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+
+        expand = self.split_param(request.query_params.get('expand'))
+        if expand:
+            for name, field in self.get_expandable_fields().items():
+                if name in expand and name in self.fields:
+                    self.fields[name] = field
+
+        fields = self.split_param(request.query_params.get('fields'))
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+    @staticmethod
+    def split_param(value):
+        return {name.strip() for name in value.split(',') if name.strip()} if value else set()
 
-class ProjectListSerializer(ModelSerializer):
+    def optimize_queryset(self, queryset):
+        model = self.Meta.model
+        only = {model._meta.pk.name}
+        select, prefetch = [], []
+        deferrable = True
+
+        for field in self.fields.values():
+            if field.source == '*':
+                deferrable = False
+                continue
+            attrs = field.source.split('.')
+            display = DISPLAY_METHOD.match(attrs[0])
+            try:
+                model_field = model._meta.get_field(display.group('field') if display else attrs[0])
+            except FieldDoesNotExist:
+                # propriété ou méthode : impossible de savoir quelles colonnes elle lit
+                deferrable = False
+                continue
+
+            if model_field.one_to_many:
+                if model_field.name in self.prefetch_related_fields:
+                    prefetch.append(self.relation_prefetch(model_field, field))
+            elif model_field.many_to_one:
+                only.add(model_field.name)
+                if len(attrs) > 1 and model_field.name in self.select_related_fields:
+                    select.append(model_field.name)
+                    only.add('__'.join(attrs[:2]))
+            elif model_field.concrete:
+                only.add(model_field.name)
+            else:
+                deferrable = False
+
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if deferrable:
+            # les clés étrangères restent chargées : les permissions remontent au projet par elles
+            only.update(self.foreign_keys(model))
+            for name in select:
+                related_model = model._meta.get_field(name).related_model
+                only.update(f'{name}__{key}' for key in self.foreign_keys(related_model))
+            queryset = queryset.only(*only)
+        return queryset
+
+    @staticmethod
+    def foreign_keys(model):
+        return [field.name for field in model._meta.concrete_fields if field.many_to_one]
+
+    @staticmethod
+    def relation_prefetch(relation, field):
+        related = relation.related_model.objects.all()
+        child = getattr(field, 'child', None)
+        if isinstance(child, EagerLoadingMixin):
+            related = child.setup_eager_loading(related.order_by('pk'))
+        else:
+            # liste de clés primaires : la clé étrangère suffit pour le rattachement
+            related = related.only('pk', relation.field.name)
+        return Prefetch(relation.name, queryset=related)
+
+
+class ProjectListSerializer(DynamicFieldsMixin, ModelSerializer):
     class Meta:
         model = Project
         fields = ['id', 'title', 'type']
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    select_related_fields = ('author_user',)
+    prefetch_related_fields = ('contributors',)
+
     author_user = serializers.CharField(source='author_user.email', read_only=False, required=False)
     type = serializers.ChoiceField(choices=Project.CHOICES, source='get_type_display')
 
@@ -20,6 +138,9 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         model = Project
         fields = ['id', 'title', 'description', 'author_user', 'type', 'contributors']
 
+    def get_expandable_fields(self):
+        return {'contributors': ContributorsDetailSerializer(many=True, read_only=True)}
+
     def get_type_display(self, obj):
         return dict(Project.CHOICES).get(obj.type)
 
@@ -45,7 +166,8 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
             except User.DoesNotExist:
                 pass
 
-        instance.save()
+        # les compteurs (jobticket.counters) sont incrémentés en base : ne pas réécrire les valeurs lues
+        instance.save(update_fields=['title', 'description', 'type', 'author_user'])
         return instance
 
     def create(self, validated_data):
@@ -53,7 +175,10 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class IssueDetailSerializer(ModelSerializer):
+class IssueDetailSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('author_user', 'assigned_to', 'project')
+    prefetch_related_fields = ('comments',)
+
     author_user = serializers.CharField(source='author_user.email')
     assigned_to = serializers.CharField(source='assigned_to.email')
     project = serializers.CharField(source='project.title')
@@ -63,6 +188,9 @@ class IssueDetailSerializer(ModelSerializer):
         fields = ['id', 'title', 'desc', 'tag', 'priority', 'status', 'project', 'author_user', 'assigned_to',
                   'comments', 'created_time']
 
+    def get_expandable_fields(self):
+        return {'comments': CommentChangeSerializer(many=True, read_only=True)}
+
     def update(self, instance, validated_data):
         instance.title = validated_data.get('title', instance.title)
         instance.desc = validated_data.get('desc', instance.desc)
@@ -86,7 +214,7 @@ class IssueDetailSerializer(ModelSerializer):
             instance.assigned_to = assigned_to_user
 
         # 'project', 'author_user' and 'created_time' fields should not change
-        instance.save(update_fields=['title', 'desc', 'tag', 'priority', 'status', 'assigned_to'])
+        instance.save(update_fields=['title', 'desc', 'tag', 'priority', 'status', 'assigned_to', 'updated_time'])
 
         return instance
 
@@ -115,7 +243,9 @@ class IssueDetailSerializer(ModelSerializer):
         return value
 
 
-class IssueListSerializer(ModelSerializer):
+class IssueListSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('author_user', 'assigned_to')
+
     author_user = serializers.CharField(source='author_user.email', read_only=False, required=False)
     assigned_to = serializers.CharField(source='assigned_to.email', read_only=False, required=False)
 
@@ -124,7 +254,40 @@ class IssueListSerializer(ModelSerializer):
         fields = ['id', 'title', 'desc', 'tag', 'priority', 'status', 'author_user', 'assigned_to']
 
 
-class ContributorsDetailSerializer(ModelSerializer):
+class IssueBulkFieldsSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Issue.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Issue.PRIORITY_CHOICES, required=False)
+    assigned_to = serializers.EmailField(required=False)
+
+
+class IssueBulkUpdateSerializer(serializers.Serializer):
+    """Selects issues by `ids` and/or `filter` and applies the same `changes` to all of them."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    filter = IssueBulkFieldsSerializer(required=False)
+    changes = IssueBulkFieldsSerializer()
+
+    def validate(self, data):
+        if not data['changes']:
+            raise serializers.ValidationError({'changes': 'At least one change is required.'})
+        if 'ids' not in data and not data.get('filter'):
+            raise serializers.ValidationError('Select the issues with "ids" or "filter".')
+        return data
+
+
+class IssueChangeSerializer(IssueListSerializer):
+    class Meta(IssueListSerializer.Meta):
+        fields = IssueListSerializer.Meta.fields + ['created_time', 'updated_time']
+
+
+class MyIssueSerializer(IssueListSerializer):
+    class Meta(IssueListSerializer.Meta):
+        fields = IssueListSerializer.Meta.fields + ['project', 'created_time']
+
+
+class ContributorsDetailSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('user', 'project')
+
     user = serializers.CharField(source="user.email")
     project = serializers.CharField(source="project.title")
 
@@ -133,7 +296,9 @@ class ContributorsDetailSerializer(ModelSerializer):
         fields = ['id', 'role', 'user', 'project', 'permission']
 
 
-class ContributorsListSerializer(ModelSerializer):
+class ContributorsListSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('user',)
+
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), source="user.email")
 
     class Meta:
@@ -141,7 +306,9 @@ class ContributorsListSerializer(ModelSerializer):
         fields = ['id', 'user']
 
 
-class CommentListSerializer(ModelSerializer):
+class CommentListSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('author_user', 'issue')
+
     author_user = serializers.CharField(source='author_user.email')
     issue = serializers.CharField(source='issue.title')
 
@@ -150,7 +317,9 @@ class CommentListSerializer(ModelSerializer):
         fields = ['id', 'author_user', 'issue']
 
 
-class CommentDetailSerializer(ModelSerializer):
+class CommentDetailSerializer(DynamicFieldsMixin, ModelSerializer):
+    select_related_fields = ('author_user', 'issue')
+
     author_user = serializers.CharField(source='author_user.email')
     issue = serializers.CharField(source='issue.title')
 
@@ -168,6 +337,45 @@ class CommentDetailSerializer(ModelSerializer):
             instance.author_user = author_user
 
         # 'project', 'author_user' and 'created_time' fields should not change
-        instance.save(update_fields=['desc', 'author_user', 'issue'])
+        instance.save(update_fields=['desc', 'author_user', 'issue', 'updated_time'])
 
         return instance
+
+
+class CommentChangeSerializer(EagerLoadingMixin, ModelSerializer):
+    select_related_fields = ('author_user',)
+
+    issue_id = serializers.IntegerField(read_only=True)
+    author_user = serializers.CharField(source='author_user.email')
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'issue_id', 'desc', 'author_user', 'created_time', 'updated_time']
+
+
+class ProjectTreeIssueSerializer(IssueListSerializer):
+    """Issue of the project tree, with the first comments prefetched by the view."""
+
+    comments = CommentChangeSerializer(many=True, read_only=True)
+
+    class Meta(IssueListSerializer.Meta):
+        fields = IssueListSerializer.Meta.fields + ['created_time', 'comments_count', 'comments']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('with_comments', True):
+            fields.pop('comments')
+        return fields
+
+
+class ProjectTreeSerializer(ProjectDetailSerializer):
+    contributors = ContributorsDetailSerializer(many=True, read_only=True)
+
+
+class ProjectDeletionSerializer(ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ProjectDeletion
+        fields = ['id', 'project_id', 'status', 'progress', 'issues_total', 'issues_deleted',
+                  'comments_total', 'comments_deleted', 'error', 'created_time', 'finished_time']
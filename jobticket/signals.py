@@ -0,0 +1,179 @@
+from collections import defaultdict
+
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import cache, changelog, counters, search
+from .models import Project, Contributor, Issue, Comment, ProjectMembership, Change
+
+
+@receiver(post_save, sender=Project)
+def sync_project_memberships(sender, instance, created, **kwargs):
+    if created:
+        ProjectMembership.objects.grant(instance.pk, instance.author_user_id)
+    else:
+        # l'auteur du projet peut changer lors d'un update
+        ProjectMembership.objects.sync_project(instance.pk)
+
+
+def contributors_saved(contributors, created=True):
+    """Memberships, counters and cache versions of saved contributors.
+
+    Called by the post_save receiver and after `bulk_create`, which sends no signal.
+    """
+    ProjectMembership.objects.grant_many(
+        [(contributor.project_id, contributor.user_id) for contributor in contributors]
+    )
+    if created:
+        added = defaultdict(int)
+        for contributor in contributors:
+            added[contributor.project_id] += 1
+        for project_id, count in added.items():
+            counters.update_project(project_id, contributors_count=count)
+    cache.bump_projects(contributor.project_id for contributor in contributors)
+    cache.bump_users(contributor.user_id for contributor in contributors)
+
+
+@receiver(post_save, sender=Contributor)
+def contributor_saved(sender, instance, created, **kwargs):
+    contributors_saved([instance], created)
+
+
+@receiver(post_delete, sender=Contributor)
+def revoke_contributor_membership(sender, instance, **kwargs):
+    ProjectMembership.objects.revoke(instance.project_id, instance.user_id)
+
+
+def issues_saved(issues, created=True, update_fields=None):
+    """Search index, change log, status counters and cache versions of saved issues.
+
+    Called by the post_save receiver and after `bulk_create`, which sends no signal.
+    """
+    search.index_issues(issues)
+    changelog.issues_written(issues)
+    count_issue_statuses(issues, created, update_fields)
+    cache.bump_projects(issue.project_id for issue in issues)
+
+
+def count_issue_statuses(issues, created, update_fields):
+    if created:
+        statuses = defaultdict(list)
+        for issue in issues:
+            statuses[issue.project_id].append(issue.status)
+        for project_id, project_statuses in statuses.items():
+            counters.issues_created(project_id, project_statuses)
+    elif update_fields is None or 'status' in update_fields:
+        for issue in issues:
+            loaded_status = getattr(issue, '_loaded_status', None)
+            if loaded_status is not None and loaded_status != issue.status:
+                counters.issues_moved(issue.project_id, {loaded_status: 1}, issue.status)
+    for issue in issues:
+        issue._loaded_status = issue.status
+
+
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance, created, update_fields=None, **kwargs):
+    issues_saved([instance], created, update_fields)
+
+
+@receiver(post_delete, sender=Issue)
+def unindex_issue(sender, instance, **kwargs):
+    search.remove('issue', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comments([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove('comment', instance.pk)
+
+
+def comment_project_id(comment):
+    if Comment.issue.is_cached(comment):
+        return comment.issue.project_id
+    # mémorisé : plusieurs receivers en ont besoin
+    if not hasattr(comment, '_project_id'):
+        comment._project_id = Issue.objects.filter(pk=comment.issue_id).values_list(
+            'project_id', flat=True).first()
+    return comment._project_id
+
+
+@receiver(post_save, sender=Project)
+def invalidate_project_responses(sender, instance, **kwargs):
+    cache.bump_project(instance.pk)
+    cache.bump_project_members(instance.pk)
+
+
+@receiver(pre_delete, sender=Project)
+def invalidate_deleted_project_responses(sender, instance, **kwargs):
+    # les memberships sont supprimées en cascade avant post_delete
+    cache.bump_project(instance.pk)
+    cache.bump_project_members(instance.pk)
+
+
+@receiver(post_delete, sender=Contributor)
+def invalidate_contributor_responses(sender, instance, **kwargs):
+    cache.bump_project(instance.project_id)
+    cache.bump_users([instance.user_id])
+
+
+@receiver(post_delete, sender=Issue)
+def invalidate_issue_responses(sender, instance, **kwargs):
+    cache.bump_project(instance.project_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        cache.bump_project(project_id)
+
+
+@receiver(post_delete, sender=Issue)
+def log_issue_deletion(sender, instance, **kwargs):
+    changelog.issues_written([instance], deleted=True)
+
+
+@receiver(post_save, sender=Comment)
+def log_comment_write(sender, instance, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        changelog.comment_written(instance, project_id)
+
+
+@receiver(post_delete, sender=Comment)
+def log_comment_deletion(sender, instance, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        changelog.comment_written(instance, project_id, deleted=True)
+
+
+@receiver(post_delete, sender=Project)
+def purge_project_changes(sender, instance, **kwargs):
+    # envoyé après la suppression en cascade des issues et commentaires
+    Change.objects.filter(project_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Contributor)
+def count_removed_contributor(sender, instance, **kwargs):
+    counters.update_project(instance.project_id, contributors_count=-1)
+
+
+@receiver(post_delete, sender=Issue)
+def count_removed_issue(sender, instance, **kwargs):
+    counters.issue_deleted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_added_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.comments_changed(instance.issue_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_removed_comment(sender, instance, **kwargs):
+    counters.comments_changed(instance.issue_id, -1)
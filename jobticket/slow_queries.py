@@ -0,0 +1,88 @@
+"""Slow-query log: every SQL statement over SLOW_QUERY_THRESHOLD_MS is written to the
+`softdesk.slow_queries` logger with its query plan and the view that ran it.
+
+The wrapper is installed on each new database connection (see `JobticketConfig.ready`). Records
+are JSON lines (`softdesk.log.JSONFormatter`), summarized by the `slow_queries` management command.
+"""
+import contextvars
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger('softdesk.slow_queries')
+
+# (route, action) de la requête en cours, renseigné par le middleware du projet (softdesk.middleware)
+current_view = contextvars.ContextVar('current_view', default=(None, None))
+
+# les requêtes EXPLAIN passent elles aussi par le wrapper
+_explaining = contextvars.ContextVar('explaining', default=False)
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def threshold():
+    """Threshold in seconds, None when the log is disabled."""
+    value = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+    return None if value is None else value / 1000
+
+
+def fingerprint(sql):
+    """SQL without the length of its IN lists, to group the same query run with different ids."""
+    return IN_LIST.sub('IN (...)', sql)
+
+
+def explain(connection, sql, params):
+    token = _explaining.set(True)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        _explaining.reset(token)
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        limit = threshold()
+        if limit is not None and duration >= limit:
+            log_query(context['connection'], sql, params, many, duration)
+
+
+def log_query(connection, sql, params, many, duration):
+    route, action = current_view.get()
+    plan = None
+    # le plan d'une écriture ou d'un executemany n'est pas rejoué
+    if not many and getattr(settings, 'SLOW_QUERY_EXPLAIN', True) and EXPLAINABLE.match(sql):
+        plan = explain(connection, sql, params)
+    # pas de paramètres dans le log : ils peuvent contenir des données personnelles
+    logger.warning('Slow query (%.1f ms)', duration * 1000, extra={'slow_query': {
+        'time': timezone.now().isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'database': connection.alias,
+        'route': route,
+        'action': action,
+        'sql': sql,
+        'fingerprint': fingerprint(sql),
+        'many': many,
+        'plan': plan,
+    }})
+
+
+def install(sender, connection, **kwargs):
+    """`connection_created` receiver."""
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
@@ -1,3 +1,862 @@
-from django.test import TestCase
+import csv
+import datetime
+import decimal
+import io
+import os
+import tempfile
+import time
+from base64 import urlsafe_b64encode
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.authentication import UserCache
+from authentication.models import User
+from softdesk.log import JSONFormatter
+from softdesk.renderers import FastJSONParser, FastJSONRenderer
+from . import cache as response_cache, counters
+from .export import iter_records
+from .models import (Project, Contributor, Issue, Comment, CacheVersion, ProjectDeletion, ProjectMembership,
+                     Change)
+from .pagination import MyIssuePagination
+from .permissions import IsContributor
+from .serializers import ProjectDetailSerializer
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SoftDeskTestCase(APITestCase):
+    """An author, its project with the author's 'Resp' contributor row, and a client authenticated as the author."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user('author@softdesk.com', 'Jean', 'Dupont')
+        self.project = self.create_project(self.user)
+        self.client.force_authenticate(self.user)
+
+    def create_user(self, email, first_name='Marie', last_name='Curie'):
+        return User.objects.create_user(email, first_name, last_name, 'password')
+
+    def create_project(self, author, **overrides):
+        fields = dict({'title': 'Project', 'description': 'Project description', 'type': 'W'}, **overrides)
+        project = Project.objects.create(author_user=author, **fields)
+        Contributor.objects.create(project=project, user=author, role='Resp', permission='CRUD')
+        return project
+
+    def add_contributor(self, user, project=None):
+        return Contributor.objects.create(project=project or self.project, user=user, role='Contrib', permission='CR')
+
+    def issue_fields(self, **overrides):
+        return dict({
+            'title': 'Issue title', 'desc': 'A long enough issue description', 'project': self.project,
+            'tag': 'Bug', 'priority': 'Low', 'status': 'To do', 'author_user': self.user, 'assigned_to': self.user,
+        }, **overrides)
+
+    def create_issue(self, **overrides):
+        return Issue.objects.create(**self.issue_fields(**overrides))
+
+    def create_issues(self, count, **overrides):
+        # bulk_create : aucun signal, comme les imports en masse
+        return Issue.objects.bulk_create([Issue(**self.issue_fields(**overrides)) for _ in range(count)])
+
+
+class ListQueryCountTests(SoftDeskTestCase):
+    """The number of queries of the list endpoints must not depend on the number of rows."""
+
+    def setUp(self):
+        super().setUp()
+        self.issue = self.create_member_issue()
+
+    def create_member_issue(self):
+        other = self.create_user(f'user{User.objects.count()}@softdesk.com')
+        self.add_contributor(other)
+        return self.create_issue(author_user=other)
+
+    def create_rows(self, count):
+        # les versions du cache de réponses changent au commit
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                Project.objects.create(
+                    title='Project', description='Project description', type='W', author_user=self.user
+                )
+                issue = self.create_member_issue()
+                Comment.objects.create(desc='A comment', issue=self.issue, author_user=issue.author_user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertConstantQueries(self, url, expected):
+        self.create_rows(1)
+        self.assertEqual(self.count_queries(url), expected)
+        self.create_rows(5)
+        self.assertEqual(self.count_queries(url), expected)
+
+    # chaque lecture commence par celle des versions du cache de réponses (jobticket.cache)
+    def test_project_list(self):
+        self.assertConstantQueries('/api/projects/', 2)
+
+    def test_contributor_list(self):
+        self.assertConstantQueries(f'/api/projects/{self.project.id}/users/', 2)
+
+    def test_issue_list(self):
+        self.assertConstantQueries(f'/api/projects/{self.project.id}/issues/', 2)
+
+    def test_comment_list(self):
+        self.assertConstantQueries(f'/api/projects/{self.project.id}/issues/{self.issue.id}/comments/', 2)
+
+    def test_sparse_fieldset_skips_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/projects/{self.project.id}/issues/?fields=id,title')
+        self.assertEqual(list(response.data[0]), ['id', 'title'])
+        self.assertEqual(len(context), 2)
+        self.assertNotIn('"desc"', context.captured_queries[-1]['sql'])
+
+    def test_expanded_comments(self):
+        # le détail d'une issue est réservé à son auteur
+        self.client.force_authenticate(self.issue.author_user)
+        self.assertConstantQueries(f'/api/projects/{self.project.id}/issues/{self.issue.id}/?expand=comments', 3)
+        response = self.client.get(f'/api/projects/{self.project.id}/issues/{self.issue.id}/?expand=comments')
+        self.assertEqual(len(response.data['comments']), 6)
+        self.assertIn('desc', response.data['comments'][0])
+
+    def test_metrics(self):
+        self.client.get(f'/api/projects/{self.project.id}/issues/')
+        body = self.client.get('/metrics').content.decode()
+        labels = '{route="project-issues-list",action="list",method="GET"}'
+        self.assertIn(f'softdesk_request_queries_count{labels}', body)
+        self.assertIn(f'softdesk_request_duration_seconds_bucket{labels[:-1]},le="+Inf"}}', body)
+        self.assertIn('softdesk_response_cache_misses_total', body)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_log(self):
+        with self.assertLogs('softdesk.slow_queries') as logs:
+            self.client.get(f'/api/projects/{self.project.id}/issues/')
+        record = logs.records[-1].slow_query
+        self.assertEqual((record['route'], record['action']), ('project-issues-list', 'list'))
+        self.assertTrue(record['plan'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.log')
+            with open(path, 'w') as file:
+                file.writelines(JSONFormatter().format(log) + '\n' for log in logs.records)
+            output = io.StringIO()
+            call_command('slow_queries', file=path, stdout=output)
+        self.assertIn(f'{len(logs.records)} slow queries', output.getvalue())
+        self.assertIn('project-issues-list:list', output.getvalue())
+
+    def test_project_tree(self):
+        url = f'/api/projects/{self.project.id}/tree/?comments=3'
+        self.assertConstantQueries(url, 5)
+        response = self.client.get(url)
+        self.assertEqual(response.data['issues']['count'], 7)
+        self.assertEqual(len(response.data['contributors']), 8)
+        self.assertEqual([len(issue['comments']) for issue in response.data['issues']['results']], [3] + [0] * 6)
+
+
+class PermissionResolverTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_user('member@softdesk.com')
+        self.outsider = self.create_user('outsider@softdesk.com', 'Paul', 'Durand')
+        self.add_contributor(self.member)
+        self.issue = self.create_issue()
+        comment = Comment.objects.create(desc='A comment', issue=self.issue, author_user=self.user)
+        self.comment = Comment.objects.select_related('issue').get(pk=comment.pk)
+
+    def check(self, user, obj):
+        request = APIRequestFactory().get('/')
+        request.user = user
+        return IsContributor().has_object_permission(request, None, obj)
+
+    def test_one_query_per_request(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.member
+        with CaptureQueriesContext(connection) as context:
+            for obj in (self.project, self.issue, self.comment):
+                self.assertTrue(IsContributor().has_object_permission(request, None, obj))
+        self.assertEqual(len(context), 1)
+        # seule l'appartenance est vérifiée : la colonne permission n'est pas lue
+        self.assertNotIn('"permission"', context.captured_queries[0]['sql'])
+
+    def test_outsider_and_deleted_project(self):
+        self.assertFalse(self.check(self.outsider, self.issue))
+        self.assertTrue(self.check(self.member, self.issue))
+        Project.objects.filter(pk=self.project.pk).update(deleted_time=datetime.datetime.now(datetime.timezone.utc))
+        self.assertFalse(self.check(self.member, self.issue))
+
+
+class AuthCacheTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_user('member@softdesk.com')
+
+    def bearer(self, user):
+        # sans l'authentification forcée de setUp, le jeton passe par JWTAuthentication
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_deactivated_user_is_rejected(self):
+        self.bearer(self.member)
+        self.assertEqual(self.client.get('/api/projects/').status_code, 200)
+        self.member.is_active = False
+        self.member.save()
+        self.assertEqual(self.client.get('/api/projects/').status_code, 401)
+
+    def test_membership_change_refreshes_project_list(self):
+        self.bearer(self.member)
+        self.assertEqual(self.client.get('/api/projects/').data, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            contributor = Contributor.objects.create(project=self.project, user=self.member, role='Contrib')
+        self.assertEqual([project['id'] for project in self.client.get('/api/projects/').data], [self.project.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            contributor.delete()
+        self.assertEqual(self.client.get('/api/projects/').data, [])
+
+    def test_invalidation_wins_over_a_running_lookup(self):
+        users = UserCache(max_size=2)
+        version = users.version(self.member.pk)
+        users.invalidate(self.member.pk)
+        users.set(self.member, version)
+        self.assertIsNone(users.get(self.member.pk))
+        users.set(self.member, users.version(self.member.pk))
+        self.assertEqual(users.get(self.member.pk), self.member)
+
+    def test_bounded_invalidations(self):
+        users = UserCache(max_size=2)
+        version = users.version(self.member.pk)
+        for user_id in range(100, 110):
+            users.invalidate(user_id)
+        self.assertEqual(len(users._invalidated), 2)
+        # invalidation oubliée : la lecture commencée avant reste refusée
+        users.set(self.member, version)
+        self.assertIsNone(users.get(self.member.pk))
+
+
+class ResponseCacheTests(SoftDeskTestCase):
+    issue = {'title': 'Issue title', 'desc': 'A long enough issue description',
+             'tag': 'Bug', 'priority': 'Low', 'status': 'To do'}
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.id}/issues/'
+
+    def test_write_invalidates_cached_list(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(self.url, self.issue, format='json').status_code, 201)
+        response = self.client.get(self.url)
+        self.assertEqual((response['X-Cache'], len(response.data)), ('MISS', 1))
+
+    def test_versions_change_on_commit(self):
+        versions = CacheVersion.objects.filter(scope='project', object_id=self.project.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(self.url, self.issue, format='json')
+        self.assertFalse(versions.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(versions.get().version, 1)
+
+    def test_rolled_back_batch_leaves_no_cached_response(self):
+        response = self.client.post('/api/batch/', {'atomic': True, 'operations': [
+            {'method': 'POST', 'path': self.url, 'body': self.issue},
+            {'method': 'GET', 'path': self.url},
+            {'method': 'POST', 'path': self.url, 'body': {'title': 'x'}},
+        ]}, format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 200, 400])
+        self.assertEqual(len(response.data['results'][1]['body']), 1)
+        self.assertEqual(self.client.get(self.url).data, [])
+
+
+class ConditionalGetTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outsider = self.create_user('outsider@softdesk.com', 'Paul', 'Durand')
+        self.url = f'/api/projects/{self.project.id}/issues/'
+
+    def test_not_modified_until_a_write(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_issue()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_versions_shared_between_processes(self):
+        etag = self.client.get(self.url)['ETag']
+        # cache local vide, comme dans un autre worker : les versions restent en base
+        cache.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # écriture traitée par un autre processus
+        response_cache.write_versions('project', [self.project.id])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_not_modified_needs_a_readable_resource(self):
+        issue = self.create_issue()
+        detail = f'{self.url}{issue.id}/'
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        self.assertEqual(self.client.get(f'{self.url}{issue.id + 1}/', HTTP_IF_NONE_MATCH='*').status_code, 404)
+        self.assertEqual(self.client.get('/api/projects/999/issues/', HTTP_IF_NONE_MATCH='*').status_code, 404)
+        # date dans le futur : ignorée
+        future = http_date(time.time() + 3600)
+        self.assertEqual(self.client.get(detail, HTTP_IF_MODIFIED_SINCE=future).status_code, 200)
+
+        self.client.force_authenticate(self.outsider)
+        for url in (self.url, detail, f'{self.url}{issue.id}/comments/'):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        self.assertEqual(self.client.get(detail, HTTP_IF_MODIFIED_SINCE=future).status_code, 404)
+
+
+class BatchTests(SoftDeskTestCase):
+    def test_reads(self):
+        base = f'/api/projects/{self.project.id}/'
+        response = self.client.post('/api/batch/', {'operations': [
+            {'path': base}, {'path': base + 'users/'}, {'path': base + 'issues/'}, {'path': '/api/nothing/'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], [200, 200, 200, 404])
+        self.assertEqual(response.data['results'][0]['body']['title'], 'Project')
+
+    def test_atomic_rollback(self):
+        issue = {'title': 'Issue title', 'desc': 'A long enough issue description',
+                 'tag': 'Bug', 'priority': 'Low', 'status': 'To do'}
+        path = f'/api/projects/{self.project.id}/issues/'
+        response = self.client.post('/api/batch/', {'atomic': True, 'operations': [
+            {'method': 'POST', 'path': path, 'body': issue},
+            {'method': 'POST', 'path': path, 'body': {'title': 'x'}},
+            {'method': 'GET', 'path': path},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 400, 424])
+        self.assertFalse(Issue.objects.exists())
+
+    def test_rejects_nested_batch(self):
+        response = self.client.post('/api/batch/', {'operations': [{'method': 'POST', 'path': '/api/batch/'}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PROJECT_DELETION_ASYNC=False)
+class ProjectDeletionTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            Comment.objects.create(desc='A comment', issue=self.create_issue(), author_user=self.user)
+
+    def test_hidden_then_purged(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(f'/api/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get('/api/projects/').data, [])
+        self.assertFalse(ProjectMembership.objects.exists())
+        self.assertEqual(Issue.objects.count(), 3)
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Issue.objects.exists() or Comment.objects.exists() or Contributor.objects.exists())
+        self.assertFalse(Change.objects.exists())
+        progress = self.client.get(f'/api/project-deletions/{response.data["deletion"]}/').data
+        self.assertEqual((progress['status'], progress['progress']), (ProjectDeletion.DONE, 1.0))
+        self.assertEqual((progress['issues_deleted'], progress['comments_deleted']), (3, 3))
+
+    def test_hidden_project_rejects_writes(self):
+        issue = Issue.objects.first()
+        comment = Comment.objects.filter(issue=issue).first()
+        # purge non exécutée : le projet reste masqué
+        with self.captureOnCommitCallbacks():
+            self.client.delete(f'/api/projects/{self.project.id}/')
+        base = f'/api/projects/{self.project.id}/issues/'
+        responses = [
+            self.client.post(f'{base}{issue.id}/comments/', {'desc': 'A late comment'}, format='json'),
+            self.client.delete(f'{base}{issue.id}/comments/{comment.id}/'),
+            self.client.delete(f'{base}{issue.id}/'),
+            self.client.post(base, {'title': 'Issue title', 'desc': 'A long enough issue description',
+                                    'tag': 'Bug', 'priority': 'Low', 'status': 'To do'}, format='json'),
+        ]
+        self.assertEqual([response.status_code for response in responses], [404] * 4)
+        self.assertEqual((Issue.objects.count(), Comment.objects.count()), (3, 3))
+        self.assertFalse(Change.objects.filter(deleted=True).exists())
+
+
+class ChangeFeedTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.id}/issues/changes/'
+
+    def test_pages(self):
+        issues = [self.create_issue() for _ in range(5)]
+        # réécrite après les autres : renvoyée à nouveau sur la page suivante
+        issues[0].save()
+        first = self.client.get(self.url, {'limit': 3}).data
+        self.assertEqual([issue['id'] for issue in first['issues']], [issue.id for issue in issues[:3]])
+        self.assertTrue(first['has_more'])
+        second = self.client.get(self.url, {'since': first['cursor'], 'limit': 3}).data
+        self.assertEqual([issue['id'] for issue in second['issues']], [issues[0].id, issues[3].id, issues[4].id])
+        self.assertFalse(second['has_more'])
+        third = self.client.get(self.url, {'since': second['cursor']}).data
+        self.assertEqual((third['issues'], third['cursor']), ([], second['cursor']))
+
+    def test_cursor_follows_commits_not_timestamps(self):
+        cursor = self.client.get(self.url).data['cursor']
+        issue = self.create_issue()
+        # horodatage antérieur au curseur, comme pour une transaction commencée avant la lecture
+        Issue.objects.filter(pk=issue.pk).update(updated_time=timezone.now() - datetime.timedelta(hours=1))
+        data = self.client.get(self.url, {'since': cursor}).data
+        self.assertEqual([row['id'] for row in data['issues']], [issue.id])
+
+    def test_deletions(self):
+        issue = self.create_issue()
+        comment = Comment.objects.create(desc='A comment', issue=issue, author_user=self.user)
+        cursor = self.client.get(self.url).data['cursor']
+        self.client.delete(f'/api/projects/{self.project.id}/issues/{issue.id}/')
+        data = self.client.get(self.url, {'since': cursor}).data
+        self.assertEqual((data['issues'], data['comments']), ([], []))
+        self.assertCountEqual(data['deleted'], [
+            {'kind': 'issue', 'id': issue.id, 'issue_id': issue.id},
+            {'kind': 'comment', 'id': comment.id, 'issue_id': issue.id},
+        ])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'since': '2024-01-01T00:00:00Z'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 'all'}).status_code, 400)
+
+
+class CounterTests(SoftDeskTestCase):
+    def test_signals_and_stats(self):
+        contributor = self.add_contributor(self.create_user('other@softdesk.com'))
+        first, second, third = self.create_issue(), self.create_issue(), self.create_issue(status='Done')
+        second.status = 'In prog'
+        second.save()
+        comments = [Comment.objects.create(desc='A comment', issue=first, author_user=self.user) for _ in range(3)]
+        comments[0].delete()
+        Comment.objects.create(desc='A comment', issue=third, author_user=self.user)
+        contributor.delete()
+        response = self.client.delete(f'/api/projects/{self.project.id}/issues/{third.id}/')
+        self.assertEqual(response.status_code, 200)
+
+        # une seule lecture, quel que soit le nombre d'issues
+        with self.assertNumQueries(1):
+            stats = self.client.get(f'/api/projects/{self.project.id}/stats/').data
+        self.assertEqual(stats, {
+            'contributors': 1,
+            'issues': {'To do': 1, 'In prog': 1, 'Done': 0},
+            'comments': 2,
+        })
+        self.assertEqual(list(Issue.objects.order_by('id').values_list('comments_count', flat=True)), [2, 0])
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+    def test_project_update_keeps_counters(self):
+        project = Project.objects.get(pk=self.project.pk)
+        # incrémenté en base pendant que l'instance est en mémoire
+        self.create_issue()
+        serializer = ProjectDetailSerializer(project, data={'title': 'Renamed project'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        project.refresh_from_db()
+        self.assertEqual((project.title, project.todo_issues_count), ('Renamed project', 1))
+
+    def test_decrement_stops_at_zero(self):
+        issue = self.create_issue()
+        Project.objects.filter(pk=self.project.pk).update(todo_issues_count=0)
+        issue.delete()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.todo_issues_count, 0)
+        self.assertEqual(counters.reconcile(), (0, 0))
+
+
+class BulkTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.base = f'/api/projects/{self.project.id}/'
+
+    def issue_data(self, **fields):
+        return dict({'title': 'Issue title', 'desc': 'A long enough issue description', 'tag': 'Bug',
+                     'priority': 'Low', 'status': 'To do'}, **fields)
+
+    def post_issues(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'{self.base}issues/bulk/', items, format='json')
+
+    def test_bulk_create(self):
+        response = self.post_issues([self.issue_data(), self.issue_data(tag='Nope'), self.issue_data(status='Done')])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item['index'] for item in response.data['created']], [0, 2])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('tag', response.data['errors'][0]['errors'])
+        issues = Issue.objects.filter(project=self.project).order_by('id')
+        self.assertEqual([issue.id for issue in issues], [item['id'] for item in response.data['created']])
+        self.assertEqual({issue.assigned_to_id for issue in issues}, {self.user.id})
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_issues_count, self.project.done_issues_count), (1, 1))
+        self.assertEqual(Change.objects.filter(kind='issue').count(), 2)
+
+    def test_bulk_create_status(self):
+        self.assertEqual(self.post_issues([self.issue_data()]).status_code, 201)
+        self.assertEqual(self.post_issues([self.issue_data(title='Bad')]).status_code, 400)
+        self.assertEqual(self.post_issues({'title': 'Not a list'}).status_code, 400)
+
+    def test_bulk_create_constant_queries(self):
+        def count(size):
+            with CaptureQueriesContext(connection) as context:
+                response = self.post_issues([self.issue_data() for _ in range(size)])
+            self.assertEqual(response.status_code, 201)
+            return len(context)
+
+        self.assertEqual(count(2), count(20))
+
+    def bulk_update(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(f'{self.base}issues/bulk-update/', data, format='json')
+
+    def test_bulk_update(self):
+        ids = [item['id'] for item in self.post_issues([self.issue_data() for _ in range(4)]).data['created']]
+        other = self.create_user('other@softdesk.com')
+        self.add_contributor(other)
+        cursor = self.client.get(f'{self.base}issues/changes/').data['cursor']
+
+        response = self.bulk_update({'ids': ids[:3], 'changes': {'status': 'Done', 'assigned_to': other.email}})
+        self.assertEqual(response.data, {'updated': 3})
+        response = self.bulk_update({'filter': {'status': 'Done'}, 'changes': {'priority': 'High'}})
+        self.assertEqual(response.data, {'updated': 3})
+
+        self.assertEqual(
+            list(Issue.objects.order_by('id').values_list('status', 'priority', 'assigned_to_id')),
+            [('Done', 'High', other.id)] * 3 + [('To do', 'Low', self.user.id)],
+        )
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_issues_count, self.project.done_issues_count), (1, 3))
+        self.assertEqual(counters.reconcile(), (0, 0))
+        changes = self.client.get(f'{self.base}issues/changes/', {'since': cursor}).data
+        self.assertEqual([issue['id'] for issue in changes['issues']], ids[:3])
+
+    def test_bulk_update_invalid(self):
+        issue_id = self.post_issues([self.issue_data()]).data['created'][0]['id']
+        stranger = self.create_user('stranger@softdesk.com', 'Paul', 'Durand')
+        for data in ({'ids': [issue_id], 'changes': {}},
+                     {'changes': {'status': 'Done'}},
+                     {'ids': [issue_id], 'changes': {'assigned_to': stranger.email}}):
+            self.assertEqual(self.bulk_update(data).status_code, 400)
+        self.assertEqual(Issue.objects.get().status, 'To do')
+
+    def test_bulk_update_constant_queries(self):
+        ids = [item['id'] for item in self.post_issues([self.issue_data() for _ in range(20)]).data['created']]
+
+        def count(selected):
+            with CaptureQueriesContext(connection) as context:
+                response = self.bulk_update({'ids': selected, 'changes': {'status': 'In prog'}})
+            self.assertEqual(response.data, {'updated': len(selected)})
+            return len(context)
+
+        self.assertEqual(count(ids[:2]), count(ids[2:]))
+
+    def add_contributors(self, emails):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'{self.base}users/', {'emails': emails}, format='json')
+
+    def test_contributors_by_email(self):
+        users = [self.create_user(f'user{index}@softdesk.com') for index in range(2)]
+        response = self.add_contributors([users[0].email, 'nobody@softdesk.com', self.user.email,
+                                          users[1].email, users[0].email])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['added', 'not_found', 'already_contributor', 'added', 'already_contributor'])
+        added = {result['email']: result['id'] for result in response.data['results'] if 'id' in result}
+        self.assertEqual(added, dict(Contributor.objects.filter(user__in=users).values_list('user__email', 'id')))
+        self.assertEqual(ProjectMembership.objects.filter(project=self.project).count(), 3)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.contributors_count, 3)
+
+        # le nouveau contributeur voit le projet
+        self.client.force_authenticate(users[1])
+        self.assertEqual([project['id'] for project in self.client.get('/api/projects/').data], [self.project.id])
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.add_contributors([users[1].email]).status_code, 200)
+
+    def test_contributors_by_email_invalid(self):
+        for emails in ([], 'user@softdesk.com', [1]):
+            self.assertEqual(self.add_contributors(emails).status_code, 400)
+
+    def test_contributors_by_email_constant_queries(self):
+        def count(size):
+            emails = [self.create_user(f'user{User.objects.count()}@softdesk.com').email for _ in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.add_contributors(emails)
+            self.assertEqual(response.status_code, 201)
+            return len(context)
+
+        self.assertEqual(count(2), count(10))
+
+
+class SearchTests(SoftDeskTestCase):
+    login_in_title = {'title': 'Login crash', 'desc': 'Happens every morning on the first attempt'}
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(result['kind'], result['id']) for result in response.data['results']]
+
+    def test_ranking_and_visibility(self):
+        in_body = self.create_issue(title='Slow screen', desc='The login page crashes on android after a timeout')
+        in_title = self.create_issue(**self.login_in_title)
+        comment = Comment.objects.create(desc='Same login problem here', issue=in_body, author_user=self.user)
+        other_project = self.create_project(self.create_user('other@softdesk.com'))
+        self.create_issue(project=other_project, **self.login_in_title)
+        self.create_issue(title='Export', desc='Nothing to do with the searched word')
+
+        # le titre pèse plus que le corps (search.TITLE_WEIGHT)
+        self.assertEqual(self.search(q='login')[0], ('issue', in_title.id))
+        self.assertCountEqual(self.search(q='login'),
+                              [('issue', in_title.id), ('issue', in_body.id), ('comment', comment.id)])
+        # tous les mots doivent correspondre, les opérateurs FTS5 sont du texte
+        self.assertEqual(self.search(q='login android'), [('issue', in_body.id)])
+        self.assertEqual(self.search(q='login OR export'), [])
+        self.assertEqual(self.search(q='"login'), self.search(q='login'))
+        self.assertEqual(self.search(q='login', project=other_project.id), [])
+
+    def test_index_follows_writes(self):
+        issue = self.create_issue(**self.login_in_title)
+        issue.title = 'Payment crash'
+        issue.save()
+        self.assertEqual((self.search(q='login'), self.search(q='payment')), ([], [('issue', issue.id)]))
+        issue.delete()
+        self.assertEqual(self.search(q='payment'), [])
+
+    def test_paging_parameters(self):
+        for index in range(3):
+            self.create_issue(title=f'Login crash {index}', desc=self.login_in_title['desc'])
+        self.assertEqual(len(self.search(q='login', limit=2)), 2)
+        self.assertEqual(len(self.search(q='login', limit=2, offset=2)), 1)
+        # LIMIT négatif ou nul : au moins un résultat, jamais toute la table
+        self.assertEqual(len(self.search(q='login', limit=-1)), 1)
+        self.assertEqual(len(self.search(q='login', limit=0)), 1)
+        for params in ({'q': ''}, {'q': 'login', 'limit': 'all'}, {'q': 'login', 'offset': '1.5'},
+                       {'q': 'login', 'project': str(2 ** 64)}, {'q': 'login', 'offset': str(2 ** 64)}):
+            self.assertEqual(self.client.get('/api/search/', params).status_code, 400)
+
+
+class MyIssueTests(SoftDeskTestCase):
+    url = '/api/my-issues/'
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other@softdesk.com')
+        self.add_contributor(self.other)
+
+    def ids(self, **params):
+        return [issue['id'] for issue in self.client.get(self.url, params).data['results']]
+
+    def test_filters(self):
+        assigned = self.create_issues(1, author_user=self.other)
+        authored = self.create_issues(1, assigned_to=self.other, status='Done')
+        self.create_issues(1, author_user=self.other, assigned_to=self.other)
+        self.assertEqual(self.ids(), [assigned[0].id, authored[0].id])
+        self.assertEqual(self.ids(role='assigned'), [assigned[0].id])
+        self.assertEqual(self.ids(role='authored', status='Done'), [authored[0].id])
+        self.assertEqual(self.client.get(self.url, {'role': 'watched'}).status_code, 400)
+
+    def test_pages_are_bounded_by_default(self):
+        issues = self.create_issues(MyIssuePagination.default_limit + 1)
+        data = self.client.get(self.url).data
+        self.assertEqual((data['count'], len(data['results'])), (len(issues), MyIssuePagination.default_limit))
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(len(self.ids(limit=50, offset=60)), 41)
+        first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 60}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual([issue['id'] for issue in first['results'] + second['results']],
+                         [issue.id for issue in issues])
+
+
+class MembershipTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_user('other@softdesk.com')
+
+    def members(self, project=None):
+        return set(ProjectMembership.objects.filter(project=project or self.project).values_list('user_id', flat=True))
+
+    def test_signals(self):
+        self.assertEqual(self.members(), {self.user.id})
+        own = Contributor.objects.get(project=self.project, user=self.user)
+        other = self.add_contributor(self.other)
+        self.assertEqual(self.members(), {self.user.id, self.other.id})
+        # l'auteur reste membre sans sa ligne de contributeur
+        own.delete()
+        other.delete()
+        self.assertEqual(self.members(), {self.user.id})
+
+        self.project.author_user = self.other
+        self.project.save()
+        self.assertEqual(self.members(), {self.other.id})
+
+    def test_visibility(self):
+        self.create_issue()
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get('/api/projects/').data, [])
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.id}/issues/').data, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_contributor(self.other)
+        self.assertEqual([project['id'] for project in self.client.get('/api/projects/').data], [self.project.id])
+        self.assertEqual(len(self.client.get(f'/api/projects/{self.project.id}/issues/').data), 1)
+
+    def test_rebuild(self):
+        self.add_contributor(self.other)
+        hidden = self.create_project(self.other, title='Hidden project')
+        Project.objects.filter(pk=hidden.pk).update(deleted_time=timezone.now())
+        ProjectMembership.objects.filter(project=self.project, user=self.other).delete()
+        ProjectMembership.objects.create(project=self.project,
+                                         user=self.create_user('stranger@softdesk.com', 'Paul', 'Durand'))
+
+        call_command('rebuild_memberships', stdout=io.StringIO())
+        self.assertEqual(self.members(), {self.user.id, self.other.id})
+        # projet masqué en attente de purge : plus aucun membre
+        self.assertEqual(self.members(hidden), set())
+
+
+class KeysetPaginationTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        issues = self.create_issues(7)
+        # horodatages égaux deux à deux : l'id départage
+        start = timezone.now() - datetime.timedelta(days=1)
+        for index, issue in enumerate(issues):
+            Issue.objects.filter(pk=issue.pk).update(created_time=start + datetime.timedelta(hours=index // 2))
+        self.expected = list(Issue.objects.order_by('created_time', 'id').values_list('id', flat=True))
+        self.url = f'/api/projects/{self.project.id}/issues/'
+
+    def test_walks_every_row_once(self):
+        ids, url, pages = [], f'{self.url}?pagination=cursor&page_size=2', 0
+        while url:
+            data = self.client.get(url).data
+            self.assertEqual(set(data), {'next', 'results'})
+            ids.extend(issue['id'] for issue in data['results'])
+            url, pages = data['next'], pages + 1
+        self.assertEqual((ids, pages), (self.expected, 4))
+
+    def test_deep_page_runs_the_same_queries(self):
+        with CaptureQueriesContext(connection) as shallow:
+            first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2}).data
+        cursor = parse_qs(urlsplit(first['next']).query)['cursor'][0]
+        with CaptureQueriesContext(connection) as deep:
+            data = self.client.get(self.url, {'cursor': cursor, 'page_size': 2}).data
+        self.assertEqual([issue['id'] for issue in data['results']], self.expected[2:4])
+        self.assertEqual(len(deep), len(shallow))
+        self.assertNotIn('COUNT(', deep.captured_queries[-1]['sql'].upper())
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', 'bm9waXBl', urlsafe_b64encode(b'yesterday|1').decode()):
+            self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 404)
+
+
+class ExportTests(SoftDeskTestCase):
+    def setUp(self):
+        super().setUp()
+        self.issues = [self.create_issue(title=f'Issue title {index}') for index in range(3)]
+        self.comments = [Comment.objects.create(desc=f'Comment {index}', issue=self.issues[index % 2],
+                                                author_user=self.user) for index in range(3)]
+        self.url = f'/api/projects/{self.project.id}/export/'
+
+    def expected_order(self):
+        first, second, third = self.issues
+        return [('issue', first.id), ('comment', self.comments[0].id), ('comment', self.comments[2].id),
+                ('issue', second.id), ('comment', self.comments[1].id), ('issue', third.id)]
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn(f'project-{self.project.id}.ndjson', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).splitlines()
+        records = [FastJSONParser().parse(io.BytesIO(line)) for line in lines]
+        self.assertEqual([(record['record'], record['id']) for record in records], self.expected_order())
+        self.assertEqual((records[0]['author_user'], records[1]['issue_id']), (self.user.email, self.issues[0].id))
+
+    def test_csv(self):
+        response = self.client.get(self.url, {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['record'], int(row['id'])) for row in rows], self.expected_order())
+        self.assertEqual((rows[0]['title'], rows[1]['title']), ('Issue title 0', ''))
+
+    def test_rejected_requests(self):
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+        self.client.force_authenticate(self.create_user('other@softdesk.com'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_two_queries_per_chunk(self):
+        issues = Issue.objects.filter(project=self.project)
+        with CaptureQueriesContext(connection) as context:
+            records = list(iter_records(issues, chunk_size=2))
+        self.assertEqual(len(records), 6)
+        # deux paquets d'issues avec leurs commentaires, puis le paquet vide qui termine le parcours
+        self.assertEqual(len(context), 5)
+
+
+class GenerateDataTests(APITestCase):
+    def test_consistent_rows(self):
+        call_command('generate_data', users=20, projects=10, batch_size=100, stdout=io.StringIO())
+        self.assertEqual(Contributor.objects.count(), ProjectMembership.objects.count())
+        self.assertEqual(counters.reconcile(), (0, 0))
+        self.assertTrue(Comment.objects.exists())
+
+    def test_generated_timestamps_leave_auto_now_alone(self):
+        call_command('generate_data', users=5, projects=3, batch_size=50, start=datetime.date(2023, 1, 1),
+                     days=30, stdout=io.StringIO())
+        end = datetime.datetime(2023, 1, 31, tzinfo=datetime.timezone.utc)
+        for model in (Issue, Comment):
+            self.assertFalse(model.objects.filter(created_time__gte=end).exists())
+            self.assertFalse(model.objects.exclude(updated_time=F('created_time')).exists())
+        # les champs du modèle ne sont pas modifiés : une sauvegarde reprend la date courante
+        issue = Issue.objects.first()
+        issue.save()
+        self.assertGreater(issue.updated_time, end)
+
+
+class FastJSONTests(SimpleTestCase):
+    data = {
+        'results': [{'id': 1, 'title': 'Écran figé', 'created_time': datetime.datetime(2023, 1, 2, 3, 4, 5, 600000),
+                     'amount': decimal.Decimal('1.50'), 'tags': ('Bug', 'Task')}],
+        'next': None,
+    }
+
+    def test_same_output_as_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_same_output_as_drf_for_edge_values(self):
+        paris = datetime.timezone(datetime.timedelta(hours=1))
+        data = {
+            'utc': datetime.datetime(2023, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'paris': datetime.datetime(2023, 1, 2, 3, 4, 5, tzinfo=paris),
+            'now': timezone.now(),
+            'date': datetime.date(2023, 1, 2),
+            'time': datetime.time(3, 4, 5, 678901),
+            'separators': 'ligne\u2028paragraphe\u2029fin',
+            'floats': [1e16, 1e-05, 0.1, decimal.Decimal('2.5'), -0.0],
+            'big_int': 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_rejected_like_drf(self):
+        for value in (float('nan'), float('inf'), decimal.Decimal('NaN')):
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                with self.assertRaises(ValueError):
+                    renderer.render({'results': [{'value': value}]})
+
+    def test_parser(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"title": "\xc3\x89cran"}')), {'title': 'Écran'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
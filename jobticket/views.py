@@ -1,34 +1,49 @@
-from django.db.models import Q
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.views import APIView
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import MethodNotAllowed, ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from . import batch, changelog, counters, search, signals
+from . import deletion as project_deletion
+from .export import FORMATS, iter_records
+from . import cache as response_cache
+from .mixins import EagerLoadingViewMixin, CachedResponseMixin, ConditionalGetMixin
+from .pagination import CreatedTimePagination, MyIssuePagination
 from .permissions import IsAuthor, IsContributor
-from .models import Project, Issue, Comment, Contributor
+from .models import Project, Issue, Comment, Change, Contributor, ProjectDeletion
 from .serializers import (ProjectListSerializer, ProjectDetailSerializer,
-                          IssueListSerializer, IssueDetailSerializer,
+                          ProjectTreeSerializer, ProjectTreeIssueSerializer,
+                          IssueListSerializer, IssueDetailSerializer, IssueBulkUpdateSerializer,
+                          IssueChangeSerializer, CommentChangeSerializer, MyIssueSerializer,
                           CommentDetailSerializer, CommentListSerializer,
-                          ContributorsDetailSerializer, ContributorsListSerializer)
+                          ContributorsDetailSerializer, ContributorsListSerializer, ProjectDeletionSerializer)
 
 User = get_user_model()
 
 
-class ProjectViewSet(ModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, CachedResponseMixin, EagerLoadingViewMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, IsAuthor]
+    cache_project_kwarg = 'pk'
 
     serializer_class = ProjectListSerializer
     detail_serializer_class = ProjectDetailSerializer
 
     def get_queryset(self):
-        return Project.objects.filter(Q(author_user=self.request.user) |
-                                      Q(contributors__user=self.request.user)).distinct()
+        return Project.objects.visible_to(self.request.user)
 
     def get_serializer_class(self):
-        print('Action used:', self.action)
         if self.action == 'update':
             return self.detail_serializer_class
         elif self.action == 'create':
@@ -62,12 +77,13 @@ class ProjectViewSet(ModelViewSet):
         return Response({"message": "Project created."}, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, pk=None):
-        project = Project.objects.get(pk=pk)
+        project = get_object_or_404(Project.objects.alive(), pk=pk)
         self.check_object_permissions(request, project)
-        project.delete()
+        # masqué tout de suite, purgé en arrière-plan (voir jobticket.deletion)
+        deletion = project_deletion.schedule(project, request.user)
         return Response(
-            {'message': 'The project has been deleted'},
-            status=status.HTTP_200_OK,
+            {'message': 'The project is being deleted', 'deletion': deletion.pk},
+            status=status.HTTP_202_ACCEPTED,
         )
 
     def update(self, request,  *args, **kwargs):
@@ -80,8 +96,86 @@ class ProjectViewSet(ModelViewSet):
             serializer.save()
             return Response({'message': 'The project has been updated'}, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Activity counters of the project, read from the denormalized columns."""
+        project = get_object_or_404(Project.objects.visible_to(request.user), pk=pk)
+        return Response({
+            'contributors': project.contributors_count,
+            'issues': {
+                issue_status: getattr(project, field) for issue_status, field in Issue.STATUS_COUNTERS.items()
+            },
+            'comments': project.comments_count,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def tree(self, request, pk=None):
+        """Project, contributors, a page of issues and the first comments of each issue, in 4 queries.
+
+        `?depth=` 0 (project), 1 (+ issues) or 2 (+ comments, default); `?limit=`/`?offset=` page the
+        issues and `?comments=` caps the comments returned per issue.
+        """
+        return self.conditional_response(partial(self.cached_response, self.build_tree), request, pk=pk)
+
+    tree_limits = {'limit': (50, 200), 'comments': (20, 100)}
+
+    def build_tree(self, request, pk=None):
+        try:
+            depth = min(max(int(request.query_params.get('depth', 2)), 0), 2)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit, comments = (
+                min(max(int(request.query_params.get(name, default)), 1), maximum)
+                for name, (default, maximum) in self.tree_limits.items()
+            )
+        except ValueError:
+            raise ValidationError({'detail': '"depth", "limit", "offset" and "comments" must be integers.'})
+
+        projects = Project.objects.visible_to(request.user).select_related('author_user').prefetch_related(
+            Prefetch('contributors', queryset=Contributor.objects.select_related('user').order_by('id'))
+        )
+        project = get_object_or_404(projects, pk=pk)
+        data = ProjectTreeSerializer(project).data
+        if depth == 0:
+            return Response(data, status=status.HTTP_200_OK)
+
+        issues = list(
+            Issue.objects.filter(project=project).select_related('author_user', 'assigned_to')
+            .order_by('created_time', 'id')[offset:offset + limit]
+        )
+        if depth == 2 and issues:
+            # les `comments` premiers commentaires de chaque issue, en une seule requête
+            first_comments = Comment.objects.filter(issue=OuterRef('issue')).order_by('created_time', 'id')
+            prefetch_related_objects(issues, Prefetch('comments', queryset=(
+                Comment.objects.filter(pk__in=Subquery(first_comments.values('pk')[:comments]))
+                .select_related('author_user').order_by('created_time', 'id')
+            )))
+
+        data['issues'] = {
+            # compteurs dénormalisés : pas de COUNT(*)
+            'count': sum(getattr(project, field) for field in Issue.STATUS_COUNTERS.values()),
+            'limit': limit,
+            'offset': offset,
+            'results': ProjectTreeIssueSerializer(issues, many=True, context={'with_comments': depth == 2}).data,
+        }
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """Stream every issue of the project followed by its comments, as NDJSON (default) or CSV."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in FORMATS:
+            raise ValidationError({'output': f'Choose one of: {", ".join(FORMATS)}.'})
+        project = get_object_or_404(Project.objects.visible_to(request.user), pk=pk)
+
+        # mêmes règles de visibilité que IssueViewSet.get_queryset
+        issues = Issue.objects.visible_to(request.user).filter(project=project)
+        render, content_type = FORMATS[output]
+        response = StreamingHttpResponse(render(iter_records(issues)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="project-{project.pk}.{output}"'
+        return response
 
-class ContributorViewSet(ModelViewSet):
+
+class ContributorViewSet(ConditionalGetMixin, EagerLoadingViewMixin, ModelViewSet):
     detail_serializer_class = ContributorsDetailSerializer
     serializer_class = ContributorsListSerializer
 
@@ -91,15 +185,18 @@ class ContributorViewSet(ModelViewSet):
         return Contributor.objects.filter(project=self.kwargs['project_id'])
 
     def get_serializer_class(self):
-        print('Action used:', self.action)
         if self.action == 'retrieve':
             raise MethodNotAllowed('RETRIEVE', detail='This endpoint does not support this method.')
         return super(ContributorViewSet, self).get_serializer_class()
 
     def create(self, request, *args, **kwargs):
-        project = get_object_or_404(Project, id=self.kwargs.get('project_id'))
+        project = get_object_or_404(Project.objects.alive(), id=self.kwargs.get('project_id'))
         self.check_object_permissions(request, project)
 
+        # Une liste `emails` permet d'ajouter plusieurs contributeurs en une fois
+        if 'emails' in request.data:
+            return self.create_many(request, project)
+
         # Get email from POST request data
         email = request.data.get('email')
         if not email:
@@ -123,11 +220,45 @@ class ContributorViewSet(ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def create_many(self, request, project):
+        emails = request.data.get('emails')
+        if not isinstance(emails, list) or not emails or not all(isinstance(email, str) for email in emails):
+            raise ValidationError({'emails': 'Expected a non-empty list of emails.'})
+
+        users = {user.email: user for user in User.objects.filter(email__in=set(emails))}
+        existing = set(project.contributors.filter(user__in=users.values()).values_list('user_id', flat=True))
+
+        results, contributors = [], []
+        for email in emails:
+            user = users.get(email)
+            if user is None:
+                results.append({'email': email, 'status': 'not_found'})
+            elif user.id in existing:
+                results.append({'email': email, 'status': 'already_contributor'})
+            else:
+                existing.add(user.id)
+                contributors.append(Contributor(project=project, user=user, permission='Create & Read',
+                                                role='Contributeur'))
+                results.append({'email': email, 'status': 'added'})
+
+        with transaction.atomic():
+            Contributor.objects.bulk_create(contributors)
+            # bulk_create n'envoie pas de signal post_save
+            signals.contributors_saved(contributors)
+
+        ids = iter(contributor.pk for contributor in contributors)
+        for result in results:
+            if result['status'] == 'added':
+                result['id'] = next(ids)
+        response_status = status.HTTP_201_CREATED if contributors else status.HTTP_200_OK
+        return Response({'results': results}, status=response_status)
+
     def destroy(self, request, project_id=None, pk=None):
         try:
-            contributor = Contributor.objects.get(pk=pk, project__pk=project_id)
+            contributor = Contributor.objects.get(pk=pk, project__pk=project_id,
+                                                  project__deleted_time__isnull=True)
             project = contributor.project
-            if project.author_user == request.user:
+            if project.author_user_id == request.user.id:
                 self.check_object_permissions(request, project)
                 contributor.delete()
                 return Response({"message": "Contributor deleted."}, status=status.HTTP_204_NO_CONTENT)
@@ -141,23 +272,17 @@ class ContributorViewSet(ModelViewSet):
         raise MethodNotAllowed('PUT', detail='This endpoint does not support the PUT method.')
 
 
-class IssueViewSet(ModelViewSet):
+class IssueViewSet(ConditionalGetMixin, CachedResponseMixin, EagerLoadingViewMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, IsAuthor, IsContributor]
+    pagination_class = CreatedTimePagination
     serializer_class = IssueListSerializer
     detail_serializer_class = IssueDetailSerializer
+    bulk_batch_size = 500
 
     def get_queryset(self):
-        contributor_projects = Project.objects.filter(
-            Q(contributors__user_id=self.request.user)
-            | Q(author_user=self.request.user)
-        )
-        return Issue.objects.filter(
-            project=self.kwargs['project_id'],
-            project__in=contributor_projects,
-        )
+        return Issue.objects.visible_to(self.request.user).filter(project=self.kwargs['project_id'])
 
     def get_serializer_class(self):
-        print('Action used:', self.action)
         if self.action == 'retrieve' or self.action == 'update':
             return self.detail_serializer_class
         return super().get_serializer_class()
@@ -168,7 +293,7 @@ class IssueViewSet(ModelViewSet):
 
         if project_id is None:
             return Response({"error": "project_id is required"}, status=400)
-        project = get_object_or_404(Project, pk=project_id)
+        project = get_object_or_404(Project.objects.alive(), pk=project_id)
 
         # Vérifier que l'utilisateur courant a les permissions appropriées pour créer l'objet Issue
         self.check_object_permissions(request, project)
@@ -205,8 +330,132 @@ class IssueViewSet(ModelViewSet):
 
         return Response({'message': 'The issue has been updated'}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, project_id=None):
+        """Create a list of issues in one transaction, invalid items are reported and skipped."""
+        project = get_object_or_404(Project.objects.alive(), pk=project_id)
+        self.check_object_permissions(request, project)
+
+        if not isinstance(request.data, list):
+            raise ValidationError({'detail': 'Expected a list of issues.'})
+
+        # validation élément par élément : les erreurs d'un élément n'écartent que celui-ci
+        child = IssueListSerializer()
+        issues, indexes, errors = [], [], []
+        for index, item in enumerate(request.data):
+            try:
+                validated_data = child.run_validation(item)
+            except ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+                continue
+            # comme pour `create`, l'auteur et l'assigné sont le user courant
+            validated_data.pop('author_user', None)
+            validated_data.pop('assigned_to', None)
+            issues.append(Issue(project=project, author_user=request.user, assigned_to=request.user,
+                                **validated_data))
+            indexes.append(index)
+
+        with transaction.atomic():
+            Issue.objects.bulk_create(issues, batch_size=self.bulk_batch_size)
+            # bulk_create n'envoie pas de signal post_save
+            signals.issues_saved(issues)
+
+        if not issues:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif errors:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({
+            'created': [{'index': index, 'id': issue.pk} for index, issue in zip(indexes, issues)],
+            'errors': errors,
+        }, status=response_status)
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request, project_id=None):
+        """Apply one change set to the selected issues of the project with a single UPDATE."""
+        project = get_object_or_404(Project.objects.alive(), pk=project_id)
+        self.check_object_permissions(request, project)
+
+        serializer = IssueBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selection = serializer.validated_data.get('filter', {})
+        changes = dict(serializer.validated_data['changes'])
+
+        issues = self.get_queryset()
+        if 'ids' in serializer.validated_data:
+            issues = issues.filter(id__in=serializer.validated_data['ids'])
+        if 'assigned_to' in selection:
+            issues = issues.filter(assigned_to__email=selection.pop('assigned_to'))
+        issues = issues.filter(**selection)
+
+        if 'assigned_to' in changes:
+            # une seule requête pour le user et son appartenance au projet
+            email = changes.pop('assigned_to')
+            assignee_id = User.objects.filter(email=email, contributor__project=project).values_list(
+                'id', flat=True).first()
+            if assignee_id is None:
+                raise ValidationError(
+                    {'assigned_to': f'User with email "{email}" is not a contributor of the project.'})
+            changes['assigned_to_id'] = assignee_id
+
+        with transaction.atomic():
+            if 'status' in changes:
+                old_status_counts = dict(issues.order_by().values_list('status').annotate(Count('id')))
+                counters.issues_moved(project.pk, old_status_counts, changes['status'])
+            # lus avant l'update : le filtre peut porter sur un champ modifié
+            changelog.issue_ids_written(project.pk, issues.order_by('id').values_list('id', flat=True))
+            # update() ne passe pas par auto_now
+            updated = issues.update(updated_time=timezone.now(), **changes)
+        response_cache.bump_project(project.pk)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+    changes_limits = (500, 1000)
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request, project_id=None):
+        """Issues and comments written or deleted after `?since=<cursor>` (from the start without it).
+
+        A page holds at most `?limit=` changes (500 by default). The returned `cursor` is the value to send
+        as `since` on the next call, immediately while `has_more` is true.
+        """
+        default_limit, max_limit = self.changes_limits
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(max(int(request.query_params.get('limit', default_limit)), 1), max_limit)
+        except ValueError:
+            raise ValidationError({'detail': '"since" and "limit" must be integers.'})
+        project = get_object_or_404(Project.objects.visible_to(request.user), pk=project_id)
+
+        # numéros attribués dans l'ordre des commits (voir jobticket.changelog)
+        log = list(Change.objects.filter(project_id=project.pk, seq__gt=since).order_by('seq')[:limit + 1])
+        has_more = len(log) > limit
+        log = log[:limit]
+        # un objet écrit plusieurs fois dans la page n'est renvoyé qu'une fois, dans son état actuel
+        latest = {(change.kind, change.object_id): change for change in log}
+        written = {'issue': [], 'comment': []}
+        for change in latest.values():
+            if not change.deleted:
+                written[change.kind].append(change.object_id)
+
+        issues = IssueChangeSerializer.setup_eager_loading(
+            Issue.objects.filter(project=project, pk__in=written['issue']))
+        comments = CommentChangeSerializer.setup_eager_loading(
+            Comment.objects.filter(issue__project=project, pk__in=written['comment']))
+        return Response({
+            'issues': IssueChangeSerializer(issues.order_by('id'), many=True).data if written['issue'] else [],
+            'comments': CommentChangeSerializer(comments.order_by('id'), many=True).data if written['comment'] else [],
+            'deleted': [
+                {'kind': change.kind, 'id': change.object_id, 'issue_id': change.issue_id}
+                for change in sorted(latest.values(), key=lambda change: change.seq) if change.deleted
+            ],
+            'cursor': log[-1].seq if log else since,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
-        issue = get_object_or_404(Issue, pk=self.kwargs['pk'])
+        # un projet en cours de suppression n'accepte plus d'écriture
+        issue = get_object_or_404(Issue.objects.alive(), pk=self.kwargs['pk'], project_id=self.kwargs['project_id'])
         self.check_object_permissions(request, issue)
         issue.delete()
         return Response(
@@ -215,35 +464,38 @@ class IssueViewSet(ModelViewSet):
         )
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, EagerLoadingViewMixin, ModelViewSet):
     permission_classes = [IsAuthenticated, IsContributor, IsAuthor]
+    pagination_class = CreatedTimePagination
     serializer_class = CommentListSerializer
     detail_serializer_class = CommentDetailSerializer
 
     def get_queryset(self):
-        contributor_projects = Project.objects.filter(
-            Q(contributors__user_id=self.request.user)
-            | Q(author_user=self.request.user)
-        )
         # il faut que le projet de l'issue reliée aux commentaires
         # soit dans les projets accessibles par le user authentifié
-        return Comment.objects.filter(
+        return Comment.objects.visible_to(self.request.user).filter(
             issue_id=self.kwargs['issue_id'],
-            issue__in=Issue.objects.filter(project__in=contributor_projects),
             issue__project_id=self.kwargs['project_id'],
-        )
+        ).select_related('issue')
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return self.detail_serializer_class
         return super().get_serializer_class()
 
+    def check_readable(self, request):
+        if self.action == 'list':
+            get_object_or_404(Issue.objects.visible_to(request.user), pk=self.kwargs['issue_id'],
+                              project_id=self.kwargs['project_id'])
+        else:
+            super().check_readable(request)
+
     def create(self, request, *args, **kwargs):
         # Récupérer l'objet Issue correspondant à l'identificateur de problème fourni dans l'URL
         issue_id = self.kwargs.get('issue_id', None)
         if issue_id is None:
             return Response({"error": "issue_id is required"}, status=400)
-        issue = get_object_or_404(Issue, pk=issue_id)
+        issue = get_object_or_404(Issue.objects.alive(), pk=issue_id, project_id=self.kwargs['project_id'])
 
         # Vérifier que l'utilisateur courant a les permissions appropriées pour créer l'objet Comment
         self.check_object_permissions(request, issue)
@@ -276,10 +528,120 @@ class CommentViewSet(ModelViewSet):
         return Response({'message': 'The comment has been updated'}, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, *args, **kwargs):
-        comment = get_object_or_404(Comment, pk=self.kwargs['pk'])
+        comment = get_object_or_404(
+            Comment.objects.alive().select_related('issue'),
+            pk=self.kwargs['pk'], issue_id=self.kwargs['issue_id'], issue__project_id=self.kwargs['project_id'],
+        )
         self.check_object_permissions(request, comment)
         comment.delete()
         return Response(
             {'message': 'The comment has been deleted'},
             status=status.HTTP_200_OK,
         )
+
+
+class MyIssueViewSet(EagerLoadingViewMixin, ListModelMixin, GenericViewSet):
+    """Issues assigned to or authored by the user, across every visible project.
+
+    `?role=assigned|authored` narrows the list, `?status=` and `?priority=` filter it.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = MyIssuePagination
+    serializer_class = MyIssueSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        role = self.request.query_params.get('role')
+        if role == 'assigned':
+            mine = Q(assigned_to=user)
+        elif role == 'authored':
+            mine = Q(author_user=user)
+        elif role is None:
+            mine = Q(assigned_to=user) | Q(author_user=user)
+        else:
+            raise ValidationError({'role': 'Choose one of: assigned, authored.'})
+
+        queryset = Issue.objects.visible_to(user).filter(mine)
+        for field in ('status', 'priority'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset.order_by('created_time', 'id')
+
+
+class ProjectDeletionViewSet(RetrieveModelMixin, ListModelMixin, GenericViewSet):
+    """Progress of the project deletions requested by the current user."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProjectDeletionSerializer
+
+    def get_queryset(self):
+        return ProjectDeletion.objects.filter(requested_by=self.request.user).order_by('-created_time', '-id')
+
+
+class SearchView(APIView):
+    """Full-text search over the issues and comments of the projects visible to the user."""
+
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+    # au-delà, SQLite refuse le paramètre (OverflowError)
+    max_integer = 2 ** 63 - 1
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This parameter is required.'})
+        try:
+            project_id = request.query_params.get('project')
+            project_id = int(project_id) if project_id else None
+            # LIMIT négatif : pas de limite pour SQLite
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError({'detail': '"project", "limit" and "offset" must be integers.'})
+        if offset > self.max_integer or (project_id is not None and abs(project_id) > self.max_integer):
+            raise ValidationError({'detail': '"project" and "offset" are out of range.'})
+
+        results = search.search(request.user, query, project_id=project_id, limit=limit, offset=offset)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class BatchView(APIView):
+    """Run several API requests at once, optionally in a single transaction.
+
+    Body: `{"operations": [{"method": "GET", "path": "/api/projects/1/", "body": null}], "atomic": false}`.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        errors = batch.validate(operations)
+        if errors:
+            raise ValidationError({'operations': errors})
+
+        if not request.data.get('atomic', False):
+            results = [batch.execute(request, operation) for operation in operations]
+            failed = [result for result in results if result['status'] >= 400]
+            if not failed:
+                response_status = status.HTTP_200_OK
+            elif len(failed) < len(results):
+                response_status = status.HTTP_207_MULTI_STATUS
+            else:
+                response_status = status.HTTP_400_BAD_REQUEST
+            return Response({'results': results}, status=response_status)
+
+        results = []
+        with transaction.atomic():
+            for operation in operations:
+                results.append(batch.execute(request, operation, atomic=True))
+                if results[-1]['status'] >= 400:
+                    # une opération a échoué : on annule tout et on n'exécute pas la suite
+                    transaction.set_rollback(True)
+                    break
+        if results[-1]['status'] >= 400:
+            skipped = [{'status': status.HTTP_424_FAILED_DEPENDENCY, 'body': None}] * (len(operations) - len(results))
+            return Response({'results': results + skipped, 'rolled_back': True}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results, 'rolled_back': False}, status=status.HTTP_200_OK)
@@ -0,0 +1,13 @@
+import json
+import logging
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: the record's `slow_query` field, or its message.
+
+    Kept free of Django imports: LOGGING is configured before the apps are loaded.
+    """
+
+    def format(self, record):
+        data = getattr(record, 'slow_query', None) or {'message': record.getMessage()}
+        return json.dumps(data, default=str)
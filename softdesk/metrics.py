@@ -0,0 +1,132 @@
+"""In-process request metrics, exposed at /metrics in the Prometheus text format.
+
+`softdesk.middleware.MetricsMiddleware` feeds the histograms; nothing leaves the process until
+Prometheus scrapes the endpoint. Values are per process: with several workers, each one is
+scraped (or summed) separately.
+"""
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from authentication.authentication import user_cache
+from jobticket import cache as response_cache
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LABELS = ('route', 'action', 'method')
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=LABELS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # compteurs par bucket (non cumulés), somme, nombre
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{format_labels(self.labels, label_values, le=bound)} {cumulative}'
+            yield f'{self.name}_bucket{format_labels(self.labels, label_values, le="+Inf")} {count}'
+            yield f'{self.name}_sum{format_labels(self.labels, label_values)} {total}'
+            yield f'{self.name}_count{format_labels(self.labels, label_values)} {count}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.labels, label_values)} {value}'
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+requests_total = Counter('softdesk_requests_total', 'Requests handled, by route, action and status.',
+                         LABELS + ('status',))
+request_duration = Histogram('softdesk_request_duration_seconds', 'Wall time of the request.', SECONDS)
+db_duration = Histogram('softdesk_request_db_duration_seconds', 'Time spent in SQL queries.', SECONDS)
+queries = Histogram('softdesk_request_queries', 'Number of SQL queries of the request.',
+                    (0, 1, 2, 3, 5, 10, 20, 50, 100, 200))
+response_size = Histogram('softdesk_response_size_bytes', 'Size of the response body.',
+                          (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+
+METRICS = (requests_total, request_duration, db_duration, queries, response_size)
+
+
+def record(route, action, method, status, seconds, db_seconds, query_count, size=None):
+    label_values = (route, action or '', method)
+    requests_total.inc(label_values + (str(status),))
+    request_duration.observe(label_values, seconds)
+    db_duration.observe(label_values, db_seconds)
+    queries.observe(label_values, query_count)
+    if size is not None:
+        response_size.observe(label_values, size)
+
+
+def cache_lines():
+    """Hit/miss counters of the response cache and of the JWT user cache."""
+    for name, stats in (('response', response_cache.stats.as_dict()), ('user', user_cache.stats())):
+        for field in ('hits', 'misses'):
+            metric = f'softdesk_{name}_cache_{field}_total'
+            yield f'# TYPE {metric} counter'
+            yield f'{metric} {stats[field]}'
+
+
+def render():
+    lines = [line for metric in METRICS for line in metric.collect()]
+    lines.extend(cache_lines())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, restricted to METRICS_ALLOWED_IPS (and open in DEBUG)."""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if not settings.DEBUG and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,62 @@
+import time
+
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+from jobticket.slow_queries import current_view
+from . import metrics
+
+EXCLUDED_PATHS = ('/metrics',)
+
+
+def view_labels(request):
+    """Route name and DRF action of the request, from its resolved URL."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched', ''
+    route = match.view_name or match.route
+    # les viewsets DRF portent la correspondance méthode -> action
+    actions = getattr(match.func, 'actions', None) or {}
+    return route, actions.get(request.method.lower(), '')
+
+
+class MetricsMiddleware:
+    """Records wall time, SQL time and count and response size per route and action.
+
+    Put first in MIDDLEWARE so the time of the other middlewares is included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path_info in EXCLUDED_PATHS:
+            return self.get_response(request)
+
+        db = {'queries': 0, 'seconds': 0.0}
+
+        def track(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db['queries'] += 1
+                db['seconds'] += time.perf_counter() - started
+
+        token = current_view.set(view_labels(request))
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(track):
+                response = self.get_response(request)
+        finally:
+            current_view.reset(token)
+        elapsed = time.perf_counter() - started
+
+        route, action = view_labels(request)
+        size = None if response.streaming else len(response.content)
+        metrics.record(route, action, request.method, response.status_code, elapsed, db['seconds'],
+                       db['queries'], size)
+        return response
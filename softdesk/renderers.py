@@ -0,0 +1,123 @@
+"""Faster renderers and parsers for the API, enabled in REST_FRAMEWORK settings.
+
+`orjson` and `msgpack` are optional: without orjson the JSON classes fall back to DRF's
+stdlib implementation, and the MessagePack classes are only registered when msgpack is installed.
+"""
+import decimal
+import math
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_json_encoder = JSONEncoder()
+
+
+# écrits à l'identique par orjson et json.dumps
+_PLAIN_TYPES = frozenset((str, int, bool, type(None)))
+
+
+def _same_as_stdlib(data):
+    """Whether orjson writes the floats of `data` like json.dumps, raises ValueError on NaN and Infinity as DRF does.
+
+    orjson writes non-finite floats as null and floats outside [1e-4, 1e16) without the `e+16`/`e-05`
+    exponent format of `repr()`.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            values = value.values()
+        elif isinstance(value, (list, tuple)):
+            values = value
+        else:
+            if isinstance(value, (float, decimal.Decimal)):
+                # les Decimal sont convertis en float par l'encodeur de DRF
+                number = float(value)
+                if not math.isfinite(number):
+                    raise ValueError(f'Out of range float values are not JSON compliant: {value!r}')
+                if number and not 1e-4 <= abs(number) < 1e16:
+                    return False
+            continue
+        # parcours en C des conteneurs qui ne contiennent que des valeurs simples (le cas courant)
+        if not _PLAIN_TYPES.issuperset(map(type, values)):
+            stack.extend(values)
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer serializing with orjson, same output for API clients."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # l'indentation demandée (API navigable, `; indent=`) et les réglages JSON
+        # UNICODE_JSON, COMPACT_JSON et STRICT_JSON modifiés restent gérés par DRF
+        if (self.get_indent(accepted_media_type, renderer_context or {})
+                or self.ensure_ascii or not self.compact or not self.strict or not _same_as_stdlib(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # dates formatées par l'encodeur de DRF : suffixe `Z` pour UTC, millisecondes
+            rendered = orjson.dumps(
+                data, default=_json_encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            # entiers de plus de 64 bits, types inconnus : DRF écrit ou lève l'erreur habituelle
+            return super().render(data, accepted_media_type, renderer_context)
+        # comme DRF : séparateurs de ligne échappés pour l'inclusion dans du JavaScript
+        return rendered.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding with orjson."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+def _msgpack_default(obj):
+    """Same conversions as DRF's JSONEncoder (dates, Decimal, UUID, lazy strings...)."""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    return _json_encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
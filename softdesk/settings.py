@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/3.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
+import os
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'softdesk.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,10 +81,24 @@ WSGI_APPLICATION = 'softdesk.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # SOFTDESK_DATABASE : autre fichier SQLite, pour les données de test de charge (voir README)
+        'NAME': os.environ.get('SOFTDESK_DATABASE', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'softdesk',
+    }
+}
+
+# Durée de vie (secondes) des réponses mises en cache par jobticket.cache
+RESPONSE_CACHE_TIMEOUT = 300
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -128,12 +145,72 @@ AUTH_USER_MODEL = "authentication.User"
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
+    ],
+    # orjson si installé (repli sur le module json sinon), MessagePack via `Accept: application/msgpack`
+    'DEFAULT_RENDERER_CLASSES': [
+        'softdesk.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'softdesk.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'softdesk.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'softdesk.renderers.MessagePackParser')
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=90),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=90),
-}
\ No newline at end of file
+}
+
+# Nombre maximal de sous-requêtes acceptées par /api/batch/
+BATCH_MAX_OPERATIONS = 20
+
+# Purge des projets supprimés : en arrière-plan (thread) et par lots de PROJECT_DELETION_BATCH_SIZE lignes
+PROJECT_DELETION_ASYNC = True
+PROJECT_DELETION_BATCH_SIZE = 1000
+
+# Adresses autorisées à lire /metrics (Prometheus) quand DEBUG est désactivé
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Journal des requêtes SQL lentes (jobticket.slow_queries), None pour le désactiver
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_LOG_FILE = BASE_DIR / 'slow_queries.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'softdesk.log.JSONFormatter'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'json',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'softdesk.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Cache des users authentifiés par JWT (authentication.authentication.CachedJWTAuthentication)
+AUTH_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+}
@@ -7,11 +7,15 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
-from jobticket.views import ProjectViewSet, CommentViewSet, IssueViewSet, ContributorViewSet
+from jobticket.views import (ProjectViewSet, CommentViewSet, IssueViewSet, ContributorViewSet, SearchView,
+                             MyIssueViewSet, ProjectDeletionViewSet, BatchView)
 from authentication.views import login,signup
+from softdesk.metrics import metrics_view
 
 router = routers.SimpleRouter()
 router.register('projects', ProjectViewSet, basename="projects")
+router.register('my-issues', MyIssueViewSet, basename='my-issues')
+router.register('project-deletions', ProjectDeletionViewSet, basename='project-deletions')
 router.register(r'projects/(?P<project_id>\d+)/issues', IssueViewSet, basename='project-issues')
 router.register(r'projects/(?P<project_id>\d+)/users', ContributorViewSet, basename='project-contributors')
 router.register(r'projects/(?P<project_id>\d+)/issues/(?P<issue_id>\d+)/comments', CommentViewSet,
@@ -19,11 +23,14 @@ router.register(r'projects/(?P<project_id>\d+)/issues/(?P<issue_id>\d+)/comments
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api-auth/', include('rest_framework.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('api/login/', login, name='login'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('api/', include(router.urls), name='api'),
     path('api/signup/', signup, name='signup'),
 ]